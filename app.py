@@ -1,18 +1,31 @@
 from __future__ import annotations
-import os, atexit, signal, logging
+import os, atexit, signal, logging, threading
 from pathlib import Path
 from flask import Flask
-from logging.handlers import TimedRotatingFileHandler
-from services.sse import SseHub
-from db import db, init_db, get_or_create_settings
-from services.mqtt_pub import init_global_publisher
-from blueprints.config_ui import bp as config_ui_bp
-from blueprints.fileops import bp as fileops_bp
-from services.solenoid_monitor import SolenoidMonitor
-from services.panel_snapshot import PanelSnapshot
-# from services.panel_monitor import PanelMonitor
+from services.log_handlers import BufferedTimedRotatingFileHandler, SingleWriteStreamHandler, CachedTimeFormatter
+from db import db, init_db, get_or_create_settings, flush_alert_history
+# Blueprints and services (GPIO, camera, paho) are imported inside create_app()
+# so the import cost is paid after logging is configured.
+
+_LOGGING_DIR: str | None = None
+
+try:
+    _VERSION = (Path(__file__).parent / "VERSION").read_text(encoding="utf-8").strip()
+except OSError:
+    _VERSION = "dev"
+
+def _default_log_dir(env=os.environ) -> str:
+    return env.get("FIREPI_LOG_DIR") or os.path.join(os.path.dirname(__file__), "logs")
 
 def configure_logging(log_dir: str) -> str:
+    global _LOGGING_DIR
+    # the format only uses threadName; skip the other per-record lookups
+    logging.logThreads = True
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False
+    logging.raiseExceptions = False
+
     level = os.getenv("FIREPI_LOG_LEVEL", "INFO").upper()
     os.makedirs(log_dir, exist_ok=True)
     log_path = os.path.join(log_dir, "app.log")
@@ -23,32 +36,78 @@ def configure_logging(log_dir: str) -> str:
     # avoid duplicate handlers if reloaded
     for h in list(root.handlers):
         root.removeHandler(h)
+        h.close()
 
-    fmt = logging.Formatter(
+    fmt = CachedTimeFormatter(
         "%(asctime)s %(levelname)s [%(name)s] %(threadName)s: %(message)s",
         "%Y-%m-%d %H:%M:%S",
     )
 
-    file_h = TimedRotatingFileHandler(
+    # buffered: flushes every 30s, on ERROR, or when the 64 KiB buffer fills
+    file_h = BufferedTimedRotatingFileHandler(
         log_path,
         when="midnight",
         backupCount=30,
         encoding="utf-8",
         delay=True,
         utc=False,
+        flush_interval=30.0,
     )
     file_h.setFormatter(fmt)
     file_h.setLevel(level)
     root.addHandler(file_h)
+    atexit.register(file_h.flush)
 
-    console = logging.StreamHandler()
+    console = SingleWriteStreamHandler()
     console.setFormatter(fmt)
     console.setLevel(level)
     root.addHandler(console)
 
+    _LOGGING_DIR = log_dir
     return log_dir
 
 
+# Hardware monitors are process-wide: repeated create_app() calls (tests,
+# preloading servers) share them instead of grabbing GPIO/camera twice.
+_MONITOR_LOCK = threading.Lock()
+_SOLENOID = None
+_PANEL_SNAPSHOT = None
+_CLEANUP_REGISTERED = False
+
+# waitress threads for ordinary requests (SSE streams get their own on top)
+_HTTP_THREADS = 8
+
+def get_solenoid(app: Flask, **kwargs):
+    global _SOLENOID
+    with _MONITOR_LOCK:
+        if _SOLENOID is None:
+            from services.solenoid_monitor import SolenoidMonitor
+            _SOLENOID = SolenoidMonitor(app=app, **kwargs)
+        return _SOLENOID
+
+def get_panel_snapshot(app: Flask, **kwargs):
+    global _PANEL_SNAPSHOT
+    with _MONITOR_LOCK:
+        if _PANEL_SNAPSHOT is None:
+            from services.panel_snapshot import PanelSnapshot
+            _PANEL_SNAPSHOT = PanelSnapshot(app=app, **kwargs)
+        return _PANEL_SNAPSHOT
+
+def _register_cleanup_once(fn) -> None:
+    global _CLEANUP_REGISTERED
+    with _MONITOR_LOCK:
+        if not _CLEANUP_REGISTERED:
+            atexit.register(fn)
+            _CLEANUP_REGISTERED = True
+
+
+# Set by signals that arrive while create_app() is still booting
+_shutdown = threading.Event()
+
+def _early_shutdown(signum, frame):
+    _shutdown.set()
+
+
 def _graceful_shutdown(signum, frame):
     logging.info("Received signal %s -> graceful shutdown", signum)
     try:
@@ -58,44 +117,89 @@ def _graceful_shutdown(signum, frame):
         raise SystemExit(0)
 
 
+def _safe_mqtt_init(app: Flask, mqtt_cfg: dict) -> None:
+    from services.mqtt_pub import init_global_publisher
+    try:
+        init_global_publisher(app, mqtt_cfg, client_id="firepi-main", timeout_s=10)
+    except Exception as e:
+        logging.info("MQTT connect failed: %s", e)
+        return
+
+    # Monitors that started before the broker came up pick up the publisher now
+    sm = app.extensions.get("solenoid_monitor")
+    if sm is not None and hasattr(sm, "attach_publisher"):
+        try:
+            sm.attach_publisher()
+        except Exception:
+            app.logger.exception("SolenoidMonitor: MQTT attach failed")
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
-    logDir = os.getenv("FIREPI_LOG_DIR") or os.path.join(os.path.dirname(__file__), "logs")
-    configure_logging(logDir)
-    app.logger.setLevel(logging.INFO)
     os.environ.setdefault("LIBCAMERA_LOG_LEVELS", "*:ERROR")
 
+    # one snapshot of the environment for all boot-time settings
+    env = os.environ.copy()
+    def _as_int(key: str, default: str) -> int:
+        return int(env.get(key, default))
+    def _as_bool(key: str, default: str) -> bool:
+        return env.get(key, default).lower() == "true"
+
+    logDir = _default_log_dir(env)
+    if _LOGGING_DIR != logDir:
+        configure_logging(logDir)
+    app.logger.setLevel(logging.INFO)
+
     for name in ("picamera2", "picamera2.picamera2"):
         lg = logging.getLogger(name)
         lg.setLevel(logging.WARNING)
         lg.propagate = False
 
-    app.config["SECRET_KEY"] = os.getenv("FIREPI_UPLOAD_TOKEN", "").strip()
+    app.config["SECRET_KEY"] = env.get("FIREPI_UPLOAD_TOKEN", "").strip()
 
-    vf = Path(app.root_path) / "VERSION"
-    if vf.exists():
-        app.config["APP_VERSION"] = vf.read_text(encoding="utf-8").strip()
-    else:
-        app.config["APP_VERSION"] = "dev"
+    app.config["APP_VERSION"] = _VERSION
+
+    # >1 spreads MQTT publishes over that many broker connections
+    app.config["MQTT_POOL_SIZE"] = max(1, _as_int("FIREPI_MQTT_POOL_SIZE", "1"))
 
-    logging.info(f"Starting PiFire v{app.config['APP_VERSION']}")
+    logging.info("Starting PiFire v%s", app.config["APP_VERSION"])
 
-    os.makedirs(app.instance_path, exist_ok=True)
-    db_path = os.path.join(app.instance_path, "alerting.db")
-    rois_path = os.path.join(app.instance_path, "panel_rois.yaml")
+    inst = Path(app.instance_path)
+    if not inst.is_dir():
+        inst.mkdir(parents=True, exist_ok=True)
+    db_path = inst / "alerting.db"
+    rois_path = str(inst / "panel_rois.yaml")
     app.config["PANEL_ROIS_PATH"] = rois_path
     app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # threaded server: give concurrent requests (and the monitor/job threads)
+    # their own SQLite connection; pre-ping drops handles that went stale
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "connect_args": {"check_same_thread": False, "timeout": 5.0},
+    }
     app.config["LOG_DIR"] = logDir
-    app.config["MUTE_STATUS_SOUNDS"] = os.getenv("MUTE_STATUS_SOUNDS", "false").lower() == "true"
-    app.config["CAMERA_SRC"] = int(os.getenv("CAMERA_SRC", "0"))
+    app.config["MUTE_STATUS_SOUNDS"] = _as_bool("MUTE_STATUS_SOUNDS", "false")
+    app.config["CAMERA_SRC"] = _as_int("CAMERA_SRC", "0")
+    # Behind a proxy, let it send audio/upload files: X-Sendfile (Apache) or
+    # X-Accel-Redirect under FIREPI_X_ACCEL_PREFIX (nginx internal location)
+    app.config["USE_X_SENDFILE"] = _as_bool("FIREPI_X_SENDFILE", "false")
+    app.config["X_ACCEL_PREFIX"] = env.get("FIREPI_X_ACCEL_PREFIX") or None
 
     init_db(app)
 
+    from blueprints.config_ui import bp as config_ui_bp
+    from blueprints.fileops import bp as fileops_bp
     app.register_blueprint(config_ui_bp)
     app.register_blueprint(fileops_bp)
 
-    app.sse_hub = SseHub(keepalive_s=25.0)
+    from services.sse import SseHub
+    # Each open /events stream holds a server thread; see _HTTP_THREADS
+    app.config["SSE_MAX_CLIENTS"] = max(1, _as_int("FIREPI_SSE_MAX_CLIENTS", "12"))
+    app.sse_hub = SseHub(keepalive_s=25.0, max_clients=app.config["SSE_MAX_CLIENTS"])
 
     @app.cli.command("init-db")
     def init_db_command():
@@ -109,20 +213,27 @@ def create_app() -> Flask:
 
         with app.app_context():
             s = get_or_create_settings()
-            mqtt_cfg = { "host": s.mqtt_host, "username": s.mqtt_user, "password": s.mqtt_password, "topic_base": s.mqtt_topic_base }
+            mqtt_cfg = { "host": s.mqtt_host, "username": s.mqtt_user, "password": s.mqtt_password, "topic_base": s.mqtt_topic_base,
+                         "pool_size": app.config["MQTT_POOL_SIZE"] }
             app.config['MQTT_TOPIC_BASE'] = mqtt_cfg.get("topic_base") or None
 
-        try:
-            init_global_publisher(app, mqtt_cfg, client_id="firepi-main", timeout_s=10)
-        except Exception as e:
-            logging.info(f"MQTT connect failed: {e}")
+        # Broker may be down; don't hold up boot (and /healthz) waiting on it
+        threading.Thread(target=_safe_mqtt_init, args=(app, mqtt_cfg), name="mqtt-init", daemon=True).start()
+
+        from concurrent.futures import ThreadPoolExecutor
+        # Bounded worker pool for request-triggered alert work (test notifications)
+        if "alert_executor" not in app.extensions:
+            app.extensions["alert_executor"] = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alert")
+        # Admin jobs (update/rollback/support bundles) run one at a time off the request thread
+        if "admin_executor" not in app.extensions:
+            app.extensions["admin_executor"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="admin")
 
         # SolenoidMonitor
         sm = app.extensions.get("solenoid_monitor")
         if sm is None:
-            sm = SolenoidMonitor(
-                app=app,
-                pin=int(os.getenv("SOLENOID_GPIO", "25")),
+            sm = get_solenoid(
+                app,
+                pin=_as_int("SOLENOID_GPIO", "25"),
                 bounce_time=0.05,
                 mute_status_sounds=app.config.get("MUTE_STATUS_SOUNDS"),
             )
@@ -131,21 +242,23 @@ def create_app() -> Flask:
         # PanelMonitor (disabled as requested)
         # pm = app.extensions.get("panel_monitor")
         # if pm is None:
+        #     from services.panel_monitor import PanelMonitor
         #     pm = PanelMonitor(
         #         app=app,
         #         rois_path=rois_path,
-        #         use_picamera2=bool(int(os.getenv("USE_PICAMERA2", "1"))),
-        #         fps=float(os.getenv("PANEL_FPS", "2.0")),
+        #         use_picamera2=bool(_as_int("USE_PICAMERA2", "1")),
+        #         fps=float(env.get("PANEL_FPS", "2.0")),
         #     )
         #     app.extensions["panel_monitor"] = pm
 
         # PanelSnapshot (new)
         ps = app.extensions.get("panel_snapshot")
         if ps is None:
-            ps = PanelSnapshot(app=app, interval=5.0)
+            ps = get_panel_snapshot(app, interval=5.0)
             app.extensions["panel_snapshot"] = ps
+            app.extensions.setdefault("snapshot_get_version", lambda: ps._snapshot_version)
 
-        # Cleanup hook
+        # Cleanup hook (registered once; monitors' stop() is idempotent)
         def _cleanup_monitors():
             app.logger.info("Cleanup: stopping monitors")
             for key in ("panel_monitor", "solenoid_monitor", "panel_snapshot"):
@@ -155,25 +268,45 @@ def create_app() -> Flask:
                         mon.stop()
                     except Exception:
                         app.logger.exception("Error stopping %s", key)
+            for key in ("alert_executor", "admin_executor"):
+                ex = app.extensions.get(key)
+                if ex is not None:
+                    ex.shutdown(wait=False, cancel_futures=True)
+            flush_alert_history()
 
         app.cleanup_monitors = _cleanup_monitors
 
         # Start services only in the serving process
-        is_real_runner = (os.environ.get("WERKZEUG_RUN_MAIN") == "true") or (not app.debug)
+        is_real_runner = (env.get("WERKZEUG_RUN_MAIN") == "true") or (not app.debug)
+
+        def _abort_if_shutdown():
+            if _shutdown.is_set():
+                app.logger.info("Shutdown requested during boot")
+                _cleanup_monitors()
+                raise SystemExit(0)
 
         if is_real_runner:
-            if not getattr(sm, "started", False):
-                sm.start()
+            _abort_if_shutdown()
+
+            # Start monitors concurrently. SolenoidMonitor stays on this thread
+            # because it installs signal handlers (main thread only).
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="boot") as ex:
+                ps_fut = None
+                if not getattr(ps, "started", False):
+                    app.logger.info("Starting panel snapshot processor...")
+                    ps_fut = ex.submit(ps.start)
 
-            # if not getattr(pm, "started", False):
-            #     app.logger.info("Starting panel monitor...")
-            #     pm.start()
+                # if not getattr(pm, "started", False):
+                #     app.logger.info("Starting panel monitor...")
+                #     pm.start()
 
-            if not getattr(ps, "started", False):
-                app.logger.info("Starting panel snapshot processor...")
-                ps.start()
+                if not getattr(sm, "started", False):
+                    sm.start()
+                if ps_fut is not None:
+                    ps_fut.result()
+            _abort_if_shutdown()
 
-        atexit.register(_cleanup_monitors)
+        _register_cleanup_once(_cleanup_monitors)
 
     except Exception as e:
         logging.exception("Service init error: %s", e)
@@ -183,7 +316,28 @@ def create_app() -> Flask:
 
 
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, _early_shutdown)
+    signal.signal(signal.SIGINT,  _early_shutdown)
+    configure_logging(_default_log_dir())
     app = create_app()
+    if _shutdown.is_set():
+        raise SystemExit(0)
     signal.signal(signal.SIGTERM, _graceful_shutdown)
     signal.signal(signal.SIGINT,  _graceful_shutdown)
-    app.run(host="0.0.0.0", port=5000, debug=False, threaded=True, use_reloader=False)
+
+    # Production WSGI server when available; Werkzeug's dev server otherwise.
+    # Single process on purpose: GPIO/camera monitors must not be duplicated.
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+
+    if serve is not None:
+        # waitress has a fixed thread pool and every open /events stream
+        # (one per browser tab/kiosk, see base.js) pins a thread for good.
+        # Reserve SSE_MAX_CLIENTS threads for streams on top of the request
+        # threads; the hub answers 503 past that so pages/API never starve.
+        threads = _HTTP_THREADS + int(app.config.get("SSE_MAX_CLIENTS") or 0)
+        serve(app, host="0.0.0.0", port=5000, threads=threads, connection_limit=200)
+    else:
+        app.run(host="0.0.0.0", port=5000, debug=False, threaded=True, use_reloader=False)
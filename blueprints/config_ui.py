@@ -1,8 +1,10 @@
-from flask import Blueprint, current_app, render_template, jsonify, request, send_file, url_for, send_from_directory, Response, stream_with_context, abort
-import threading, time
+from flask import Blueprint, current_app, render_template, jsonify, request, send_file, url_for, send_from_directory, Response, stream_with_context, abort, copy_current_request_context
+import os, threading, time, uuid
 from pathlib import Path
-from db import db, Recipient, AlertHistory, alert_history_as_dict, get_or_create_settings
+from sqlalchemy import select, update
+from db import db, Recipient, Settings, AlertHistory, alert_history_as_dict, get_settings_cached
 from services.audio import (
+    get_audio_dir,
     list_audio_files,
     save_upload,
     ensure_exists,
@@ -12,10 +14,24 @@ from services.audio import (
     delete_audio
 )
 from services import admin_ops
+from services.etag import etag, data_version
 from services import wifi_nm
 
 bp = Blueprint("config_ui", __name__)
 
+def _norm(d: dict, k: str):
+    """Strip string values, mapping blanks to None; other values pass through."""
+    v = d.get(k)
+    return (v.strip() or None) if isinstance(v, str) else v
+
+def _audio_dir_sig() -> str | None:
+    try:
+        with os.scandir(get_audio_dir()) as it:
+            mtimes = [e.stat().st_mtime_ns for e in it]
+    except OSError:
+        return None
+    return f"{len(mtimes)}-{max(mtimes, default=0)}"
+
 @bp.route("/")
 def index():
     return render_template("panel_snapshot.html")
@@ -62,18 +78,33 @@ def sse_events():
     except Exception:
         pass
 
-    gen = current_app.sse_hub.stream(initial=initial)
+    hub = current_app.sse_hub
+    q = hub.register()
+    if q is None:
+        # All stream slots busy; EventSource retries on its own
+        return Response("too many event streams\n", status=503,
+                        headers={"Retry-After": "30"}, mimetype="text/plain")
+    gen = hub.stream(initial=initial, q=q)
 
     headers = {
         "Content-Type": "text/event-stream",
         "Cache-Control": "no-cache",
         "Connection": "keep-alive",
     }
-    return Response(stream_with_context(gen), headers=headers)
+    resp = Response(stream_with_context(gen), headers=headers)
+    # Free the slot even if the client goes away before the stream starts
+    resp.call_on_close(lambda: hub.unregister(q))
+    return resp
 
 @bp.get("/api/recipients")
+@etag(lambda: data_version("recipients"))
 def list_recipients():
-    recs = Recipient.query.order_by(Recipient.created_at.desc()).all()
+    # plain rows: only these columns are serialized, skip ORM instances
+    stmt = select(
+        Recipient.id, Recipient.name, Recipient.phone, Recipient.email,
+        Recipient.receive_sms, Recipient.created_at,
+    ).order_by(Recipient.created_at.desc())
+    recs = db.session.execute(stmt)
     return jsonify([{
         "id": r.id,
         "name": r.name,
@@ -86,14 +117,14 @@ def list_recipients():
 @bp.post("/api/recipients")
 def create_recipient():
     data = request.get_json(force=True) or {}
-    name = (data.get("name") or "").strip()
+    name = _norm(data, "name")
     if not name:
         return jsonify({"error": "Missing required field: name"}), 400
 
     r = Recipient(
         name=name,
-        phone=(data.get("phone") or "").strip() or None,
-        email=(data.get("email") or "").strip() or None,
+        phone=_norm(data, "phone"),
+        email=_norm(data, "email"),
         receive_sms=bool(data.get("receive_sms", False)),
     )
     db.session.add(r)
@@ -106,14 +137,14 @@ def update_recipient(rid: int):
     data = request.get_json(force=True) or {}
 
     if "name" in data:
-        name = (data.get("name") or "").strip()
+        name = _norm(data, "name")
         if not name:
             return jsonify({"error": "Name cannot be empty"}), 400
         r.name = name
     if "phone" in data:
-        r.phone = (data.get("phone") or "").strip() or None
+        r.phone = _norm(data, "phone")
     if "email" in data:
-        r.email = (data.get("email") or "").strip() or None
+        r.email = _norm(data, "email")
     if "receive_sms" in data:
         r.receive_sms = bool(data.get("receive_sms"))
 
@@ -128,8 +159,9 @@ def delete_recipient(rid: int):
     return jsonify({"status": "ok"})
 
 @bp.get("/api/settings")
+@etag(lambda: data_version("settings"))
 def get_settings():
-    s = get_or_create_settings()
+    s = get_settings_cached()
     return jsonify({
         "enable_speaker_alert": s.enable_speaker_alert,
         "enable_phone_alert": s.enable_phone_alert,
@@ -162,46 +194,35 @@ def get_settings():
         "mqtt_topic_base": s.mqtt_topic_base,
     })
 
+_SETTINGS_FIELDS = (
+    "enable_speaker_alert", "enable_phone_alert", "enable_email_alert", "enable_sms_alert",
+    "telephony_provider",
+    "smtp_server", "smtp_username", "smtp_password", "smtp_notify_text",
+    "twilio_username", "twilio_token", "twilio_api_secret", "twilio_source_number", "twilio_notify_text",
+    "clicksend_username", "clicksend_api_key", "clicksend_from", "clicksend_voice_from", "clicksend_notify_text",
+    "mqtt_host", "mqtt_user", "mqtt_password", "mqtt_topic_base",
+)
+_AUDIO_FIELDS = ("solenoid_activated_audio", "solenoid_deactivated_audio")
+
 @bp.put("/api/settings")
 def update_settings():
-    s = get_or_create_settings()
+    s = get_settings_cached()
     data = request.get_json(force=True) or {}
 
-    def validate_text(field):
-        if field in data and data[field] is not None:
-            val = str(data[field]).strip()
-            if len(val) > 255:
-                return f"{field} must be 255 characters or fewer."
-    
-    for fld in ("smtp_notify_text", "twilio_notify_text", "clicksend_notify_text"):
-        err = validate_text(fld)
-        if err:
-            return jsonify({"error": err}), 400
-    
-    for fld in ("solenoid_activated_audio", "solenoid_deactivated_audio"):
-        if fld in data and data[fld] is not None:
-            val = str(data[fld]).strip()
-            if len(val) > 255:
-                return jsonify({"error": f"{fld} must be 255 characters or fewer."}), 400
-            setattr(s, fld, val if val else None)
-        elif fld in data:
-            setattr(s, fld, None)
-
-    for field in [
-        "enable_speaker_alert", "enable_phone_alert", "enable_email_alert", "enable_sms_alert",
-        "telephony_provider",
-        "smtp_server", "smtp_username", "smtp_password", "smtp_notify_text",
-        "twilio_username", "twilio_token", "twilio_api_secret", "twilio_source_number", "twilio_notify_text",
-        "clicksend_username", "clicksend_api_key", "clicksend_from", "clicksend_voice_from", "clicksend_notify_text",
-        "mqtt_host", "mqtt_user", "mqtt_password", "mqtt_topic_base",
-    ]:
-        if field in data:
-            setattr(s, field, (data[field].strip() if isinstance(data[field], str) else data[field]))
+    # one normalization pass; the result feeds a single UPDATE
+    changes = {k: _norm(data, k) for k in (*_SETTINGS_FIELDS, *_AUDIO_FIELDS) if k in data}
+
+    for fld in ("smtp_notify_text", "twilio_notify_text", "clicksend_notify_text", *_AUDIO_FIELDS):
+        val = changes.get(fld)
+        if val is not None and len(str(val)) > 255:
+            return jsonify({"error": f"{fld} must be 255 characters or fewer."}), 400
 
     if "smtp_port" in data:
-        setattr(s, "smtp_port", int(data["smtp_port"]) if data["smtp_port"] not in (None, "",) else None)
+        changes["smtp_port"] = int(data["smtp_port"]) if data["smtp_port"] not in (None, "",) else None
 
-    db.session.commit()
+    if changes:
+        db.session.execute(update(Settings).where(Settings.id == s.id).values(**changes))
+        db.session.commit()
     return jsonify({"status": "ok"})
 
 @bp.get("/api/health")
@@ -219,7 +240,10 @@ def api_history():
     except ValueError:
         limit = 50
 
-    rows = (AlertHistory.query.order_by(AlertHistory.ts.desc()).limit(limit).all())
+    stmt = (select(AlertHistory.id, AlertHistory.ts, AlertHistory.alert_type, AlertHistory.sensor,
+                   AlertHistory.sensor_val, AlertHistory.channel, AlertHistory.status, AlertHistory.error_text)
+            .order_by(AlertHistory.ts.desc()).limit(limit))
+    rows = db.session.execute(stmt)
     return jsonify([alert_history_as_dict(r) for r in rows])
 
 @bp.get("/api/notifications/test")
@@ -228,22 +252,27 @@ def test_notifications():
     if not mon:
         return jsonify({"status": "error", "error": "Monitor not initialized"}), 503
 
-    threading.Thread(
-        target=mon.test_alerts,
-        kwargs={"message": "TEST: Furnace alert system check"},
-        daemon=True,
-        name="test-alerts",
-    ).start()
+    ex = current_app.extensions.get("alert_executor")
+    if ex is not None:
+        ex.submit(mon.test_alerts, message="TEST: Furnace alert system check")
+    else:
+        threading.Thread(
+            target=mon.test_alerts,
+            kwargs={"message": "TEST: Furnace alert system check"},
+            daemon=True,
+            name="test-alerts",
+        ).start()
 
     return jsonify({"status": "ok"})
 
 @bp.get("/api/audio/files")
+@etag(_audio_dir_sig)
 def api_audio_files():
     return jsonify(list_audio_files())
 
 @bp.get("/api/audio/settings")
 def api_audio_settings_get():
-    s = get_or_create_settings()
+    s = get_settings_cached()
     vol = get_system_volume()
     return jsonify({
         "solenoid_activated_audio": s.solenoid_activated_audio,
@@ -253,10 +282,10 @@ def api_audio_settings_get():
 
 @bp.put("/api/audio/settings")
 def api_audio_settings_put():
-    s = get_or_create_settings()
+    s = get_settings_cached()
     data = request.get_json(force=True) or {}
-    act = (data.get("solenoid_activated_audio") or "").strip() or None
-    deact = (data.get("solenoid_deactivated_audio") or "").strip() or None
+    act = _norm(data, "solenoid_activated_audio")
+    deact = _norm(data, "solenoid_deactivated_audio")
 
     if act and not ensure_exists(act):
         return jsonify({"error": f"File not found: {act}"}), 400
@@ -341,15 +370,56 @@ def admin_version():
         "has_backup": admin_ops.backup_exists(current_app),
     })
 
+# --- Long-running admin jobs -------------------------------------------------
+# update/rollback/bundle/upload take tens of seconds; they run on the admin
+# executor and the client polls /api/admin/jobs/<id> for the result.
+_MAX_ADMIN_JOBS = 20
+
+def _submit_admin_job(fn):
+    """fn() -> (body: dict, http_status: int); runs with a copy of this request context."""
+    ex = current_app.extensions.get("admin_executor")
+    if ex is None:
+        body, code = fn()
+        return jsonify(body), code
+
+    jobs = current_app.extensions.setdefault("admin_jobs", {})
+    job_id = uuid.uuid4().hex
+    jobs[job_id] = ex.submit(copy_current_request_context(fn))
+    # keep the most recent jobs only (dicts preserve insertion order)
+    for old in list(jobs)[:-_MAX_ADMIN_JOBS]:
+        if jobs[old].done():
+            jobs.pop(old, None)
+    return jsonify({"status": "queued", "job_id": job_id}), 202
+
+@bp.get("/api/admin/jobs/<job_id>")
+def admin_job_status(job_id: str):
+    fut = current_app.extensions.get("admin_jobs", {}).get(job_id)
+    if fut is None:
+        return jsonify({"status": "error", "error": "unknown job"}), 404
+    if not fut.done():
+        return jsonify({"job_id": job_id, "done": False})
+    try:
+        body, code = fut.result(timeout=0)
+    except Exception as e:
+        current_app.logger.exception("Admin job %s failed", job_id)
+        body, code = {"status": "error", "error": str(e)}, 500
+    return jsonify({"job_id": job_id, "done": True, "http_status": code, "result": body})
+
 @bp.post("/api/admin/update")
 def admin_update():
-    resp = admin_ops.update_firepi(current_app)
-    return jsonify(resp), (200 if resp.get("status") == "ok" else 500)
+    app = current_app._get_current_object()
+    def _run():
+        resp = admin_ops.update_firepi(app)
+        return resp, (200 if resp.get("status") == "ok" else 500)
+    return _submit_admin_job(_run)
 
 @bp.post("/api/admin/rollback")
 def admin_rollback():
-    resp = admin_ops.rollback_from_backup(current_app)
-    return jsonify(resp), (200 if resp.get("status") == "ok" else 500)
+    app = current_app._get_current_object()
+    def _run():
+        resp = admin_ops.rollback_from_backup(app)
+        return resp, (200 if resp.get("status") == "ok" else 500)
+    return _submit_admin_job(_run)
 
 @bp.post("/api/admin/reboot")
 def admin_reboot():
@@ -363,11 +433,14 @@ def admin_reboot():
 def admin_support_bundle():
     data = request.get_json(silent=True) or {}
     include = bool(data.get("include_snapshot", True))
-    ok, bundle_path, msg = admin_ops.create_support_bundle(current_app, include_snapshot=include)
-    if not ok or not bundle_path:
-        return jsonify({"status": "error", "error": msg}), 500
-    dl_url = url_for("config_ui.support_download", filename=bundle_path.name)
-    return jsonify({"status": "ok", "download_url": dl_url, "message": msg})
+    app = current_app._get_current_object()
+    def _run():
+        ok, bundle_path, msg = admin_ops.create_support_bundle(app, include_snapshot=include)
+        if not ok or not bundle_path:
+            return {"status": "error", "error": msg}, 500
+        dl_url = url_for("config_ui.support_download", filename=bundle_path.name)
+        return {"status": "ok", "download_url": dl_url, "message": msg}, 200
+    return _submit_admin_job(_run)
 
 @bp.get("/api/admin/support/download/<path:filename>")
 def support_download(filename: str):
@@ -381,23 +454,24 @@ def admin_support_upload():
     use_latest = bool(data.get("use_latest", True))
     include = bool(data.get("include_snapshot", True))
 
-    if kind == "logs":
-        ok, msg = admin_ops.upload_logs_to_remote(current_app)
-    elif kind == "snapshot":
-        ok, msg = admin_ops.upload_snapshot_to_remote(current_app)
-    elif kind == "bundle":
-        ok, msg = admin_ops.upload_bundle_to_remote(current_app, use_latest=use_latest, include_snapshot=include)
-    else:
+    if kind not in ("logs", "snapshot", "bundle"):
         return jsonify({"status": "error", "error": "unknown upload type"}), 400
 
-    return (jsonify({"status": "ok", "message": msg})
-            if ok else
-            (jsonify({"status": "error", "error": msg}), 500))
+    app = current_app._get_current_object()
+    def _run():
+        if kind == "logs":
+            ok, msg = admin_ops.upload_logs_to_remote(app)
+        elif kind == "snapshot":
+            ok, msg = admin_ops.upload_snapshot_to_remote(app)
+        else:
+            ok, msg = admin_ops.upload_bundle_to_remote(app, use_latest=use_latest, include_snapshot=include)
+        return ({"status": "ok", "message": msg}, 200) if ok else ({"status": "error", "error": msg}, 500)
+    return _submit_admin_job(_run)
 
 @bp.post("/api/admin/support/upload-snapshot")
 def admin_support_upload_snapshot():
     data = request.get_json(force=True) or {}
-    url = (data.get("url") or "").strip()
+    url = _norm(data, "url")
     if not url:
         return jsonify({"error": "Missing url"}), 400
     ok, msg = admin_ops.upload_snapshot(current_app, url)
@@ -441,8 +515,8 @@ def api_wifi_scan():
 def api_wifi_connect():
     try:
         body = request.get_json(silent=True) or {}
-        ssid = (body.get("ssid") or "").strip()
-        psk  = (body.get("psk") or "").strip()
+        ssid = _norm(body, "ssid") or ""
+        psk  = _norm(body, "psk") or ""
         out = wifi_nm.connect(ssid, psk)
         out.setdefault("status", "ok")
         return jsonify(out), 200
@@ -453,7 +527,7 @@ def api_wifi_connect():
 @bp.post("/api/wifi/forget")
 def api_wifi_forget():
     data = request.get_json(force=True) or {}
-    ssid = (data.get("ssid") or "").strip()
+    ssid = _norm(data, "ssid") or ""
     from services.wifi_nm import forget
     try:
         resp = forget(ssid)
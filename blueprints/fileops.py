@@ -10,29 +10,38 @@ from flask import (
     jsonify,
     request,
     session,
-    send_from_directory,
     render_template,
 )
 from werkzeug.utils import secure_filename
 
+from services.file_send import send_from_directory_accel
+from services.upload_io import save_file_storage
+
 bp = Blueprint("fileops", __name__, url_prefix="/fileops")
 
+# Simple commands run without a shell when the line has nothing for bash to expand
+_DIRECT_CMDS = {"ls", "cat", "head", "tail", "stat"}
+_SHELL_META = set("|&;<>*?$`{}()[]~!#\n")
+
 # --- helpers -----------------------------------------------------------------
 
 def uploads_dir() -> Path:
     """
-    Ensure and return the instance/uploads directory.
+    Ensure and return the (resolved) instance/uploads directory.
+    Created and resolved once per app, then served from app.extensions.
     """
-    inst = Path(current_app.instance_path)
-    up = inst / "uploads"
-    up.mkdir(parents=True, exist_ok=True)
+    up = current_app.extensions.get("uploads_dir")
+    if up is None:
+        up = Path(current_app.instance_path) / "uploads"
+        up.mkdir(parents=True, exist_ok=True)
+        up = current_app.extensions["uploads_dir"] = up.resolve()
     return up
 
 def session_cwd() -> Path:
     """
     Get or initialize the per-session working directory, confined under instance/uploads.
     """
-    base = uploads_dir().resolve()
+    base = uploads_dir()
     # initialize if missing
     cwd = session.get("cwd")
     if not cwd:
@@ -41,15 +50,15 @@ def session_cwd() -> Path:
 
     # sanitize: keep it inside base
     p = Path(cwd).resolve()
-    if not str(p).startswith(str(base)):
+    if not p.is_relative_to(base):
         p = base
         session["cwd"] = str(p)
     return p
 
 def set_session_cwd(new_dir: Path) -> None:
-    base = uploads_dir().resolve()
+    base = uploads_dir()
     p = new_dir.resolve()
-    if not str(p).startswith(str(base)):
+    if not p.is_relative_to(base):
         # ignore attempts to escape
         return
     session["cwd"] = str(p)
@@ -73,12 +82,12 @@ def ui():
 
 @bp.route("/files", methods=["GET"])
 def list_files():
-    up = uploads_dir()
-    files = []
-    for entry in sorted(up.iterdir()):
-        if entry.is_file():
-            # size in bytes
-            files.append({"name": entry.name, "size": entry.stat().st_size})
+    # scandir: file type comes from the directory read, no stat() per entry
+    with os.scandir(uploads_dir()) as it:
+        entries = [e for e in it if e.is_file(follow_symlinks=False)]
+    entries.sort(key=lambda e: e.name)
+    # size in bytes
+    files = [{"name": e.name, "size": e.stat(follow_symlinks=False).st_size} for e in entries]
     return jsonify({"files": files})
 
 @bp.route("/upload", methods=["POST"])
@@ -91,7 +100,7 @@ def upload_file():
         return jsonify({"ok": False, "error": "No selected file"}), 400
 
     target = safe_path_in_uploads(f.filename)
-    f.save(str(target))
+    save_file_storage(f, target)
     return jsonify({"ok": True})
 
 @bp.route("/delete", methods=["POST"])
@@ -113,11 +122,13 @@ def delete_file():
 @bp.route("/download/<path:filename>", methods=["GET"])
 def download_file(filename):
     # download strictly from uploads/
-    return send_from_directory(
-        directory=str(uploads_dir()),
-        path=secure_filename(filename),
+    fn = secure_filename(filename)
+    return send_from_directory_accel(
+        uploads_dir(),
+        fn,
+        "uploads",
         as_attachment=True,
-        download_name=secure_filename(filename),
+        download_name=fn,
     )
 
 @bp.route("/state", methods=["GET"])
@@ -131,7 +142,8 @@ def run_cmd():
     """
     Execute a single command within the per-session working directory.
     - Supports built-in 'cd' (e.g., 'cd ..', 'cd subdir')
-    - Otherwise runs via /bin/bash -lc "<command>" so pipes/globs work
+    - Simple ls/cat/head/tail/stat lines are exec'd directly
+    - Otherwise runs via /bin/bash -c "<command>" so pipes/globs work
     - Captures combined stdout+stderr and return code
     """
     data = request.get_json(silent=True) or {}
@@ -140,13 +152,15 @@ def run_cmd():
     if not cmd_line:
         return jsonify({"ok": False, "error": "Empty command"}), 400
 
-    base = uploads_dir().resolve()
+    base = uploads_dir()
     cwd = session_cwd()
 
     # built-in: cd
     if cmd_line.startswith("cd"):
         # allow: "cd", "cd ..", "cd subdir/.."
-        parts = shlex.split(cmd_line)
+        parts = cmd_line.split(None, 1)
+        if len(parts) > 1 and ("'" in parts[1] or '"' in parts[1] or "\\" in parts[1]):
+            parts = shlex.split(cmd_line)
         target = base if len(parts) == 1 else (cwd / parts[1])
 
         try:
@@ -161,7 +175,7 @@ def run_cmd():
                 })
             # normalize and clamp inside uploads
             new_dir = new_dir.resolve()
-            if not str(new_dir).startswith(str(base)):
+            if not new_dir.is_relative_to(base):
                 # clamp
                 new_dir = base
             set_session_cwd(new_dir)
@@ -175,9 +189,16 @@ def run_cmd():
         return jsonify({"ok": True, "output": str(cwd), "rc": 0, "prompt": prompt(), "cwd": str(cwd)})
 
     # Everything else: run via bash (for pipes/globs). Security caution: this executes on the host.
+    # No login shell (-l): sourcing the profile dominated the cost of short commands.
+    argv = ["/bin/bash", "-c", cmd_line]
+    if cmd_line.split(None, 1)[0] in _DIRECT_CMDS and not (_SHELL_META & set(cmd_line)):
+        try:
+            argv = shlex.split(cmd_line)
+        except ValueError:
+            pass
     try:
         proc = subprocess.run(
-            ["/bin/bash", "-lc", cmd_line],
+            argv,
             cwd=str(session_cwd()),
             capture_output=True,
             text=True,
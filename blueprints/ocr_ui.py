@@ -1,9 +1,179 @@
-from flask import Blueprint, current_app, render_template, jsonify, request
+from flask import Blueprint, current_app, render_template, jsonify, request, url_for
 from services.seg7 import read_lcd_roi, ssocr_read_digits
-import numpy as np, cv2, base64, os, json, time, yaml
+from services.etag import etag
+import numpy as np, cv2, base64, os, json, time, yaml, threading, copy, uuid, logging
+from collections import OrderedDict
+from functools import lru_cache
+import struct
 
 ocr_bp = Blueprint("config_ui", __name__)
 
+# LibYAML C bindings when available
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# libjpeg-turbo (SIMD) for dry-run decode and preview encode; OpenCV otherwise
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _TJ = TurboJPEG()
+except Exception:
+    _TJ = None
+
+# libjpeg-turbo decoder for dry-run uploads; cv2.imdecode otherwise
+try:
+    import jpeg4py
+except ImportError:
+    jpeg4py = None
+
+# SIMD base64 for the preview payload; stdlib otherwise
+try:
+    from pybase64 import b64encode_as_string as _b64_str
+except ImportError:
+    def _b64_str(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
+
+# orjson (C) for the dry-run payload and debug logging; stdlib json otherwise
+try:
+    import orjson
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY
+except ImportError:
+    orjson = None
+
+def _json_dumps(o) -> str:
+    if orjson is not None:
+        return orjson.dumps(o, option=_ORJSON_OPTS).decode()
+    return json.dumps(o)
+
+def _json_response(obj):
+    if orjson is not None:
+        return current_app.response_class(orjson.dumps(obj, option=_ORJSON_OPTS),
+                                          mimetype="application/json")
+    return jsonify(obj)
+
+# LED hue gate as a lookup table (OpenCV 8-bit hue is 0..179): red at both
+# ends of the wheel, green in the middle; one gather instead of five compares
+_LED_HUE_OK = np.zeros(256, dtype=bool)
+_LED_HUE_OK[:11] = True
+_LED_HUE_OK[170:] = True
+_LED_HUE_OK[40:91] = True
+
+@lru_cache(maxsize=16)
+def _led_sv_min(sat_thr: int, val_thr: int) -> tuple[int, int]:
+    return max(60, sat_thr-50), max(70, val_thr-50)
+
+def _roi_is_dark(img_bgr, std_max: float = 5.0, mean_max: float = 20.0) -> bool:
+    """True for a flat, near-black ROI (display off): nothing for ssocr to read."""
+    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY) if img_bgr.ndim == 3 else img_bgr
+    m, sd = cv2.meanStdDev(gray)
+    return float(sd[0, 0]) < std_max and float(m[0, 0]) < mean_max
+
+# SOFn markers (baseline, progressive, lossless, arithmetic); C4/C8/CC are not frames
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _exif_orientation(seg: bytes) -> int:
+    """EXIF Orientation (1-8) from an APP1 payload; 1 if absent/unreadable."""
+    if seg[:6] != b"Exif\x00\x00" or len(seg) < 14:
+        return 1
+    tiff = seg[6:]
+    bo = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if bo is None:
+        return 1
+    try:
+        ifd = struct.unpack_from(bo + "I", tiff, 4)[0]
+        count = struct.unpack_from(bo + "H", tiff, ifd)[0]
+        for k in range(count):
+            tag, typ, _cnt = struct.unpack_from(bo + "HHI", tiff, ifd + 2 + 12 * k)
+            if tag == 0x0112 and typ == 3:  # Orientation, SHORT
+                v = struct.unpack_from(bo + "H", tiff, ifd + 2 + 12 * k + 8)[0]
+                return v if 1 <= v <= 8 else 1
+    except struct.error:
+        pass
+    return 1
+
+def _jpeg_info(data: bytes) -> tuple[tuple[int, int] | None, int]:
+    """
+    ((w, h) from the first SOF segment or None, EXIF orientation), walking
+    marker lengths; no decode. w/h are as stored, before any rotation.
+    """
+    i, n, orient = 2, len(data), 1
+    while i + 9 <= n:
+        if data[i] != 0xFF:
+            return None, orient
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in _JPEG_SOF:
+            h, w = struct.unpack_from(">HH", data, i + 5)
+            return ((w, h) if w and h else None), orient
+        if marker == 0xD9 or marker == 0xDA:  # EOI / start of scan before any SOF
+            return None, orient
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # no length field
+            i += 2
+            continue
+        seg_len = struct.unpack_from(">H", data, i + 2)[0]
+        if marker == 0xE1 and orient == 1:
+            orient = _exif_orientation(data[i + 4:i + 2 + seg_len])
+        i += 2 + seg_len
+    return None, orient
+
+def _encode_jpeg(img, quality: int = 75) -> bytes | None:
+    if _TJ is not None:
+        try:
+            return _TJ.encode(img, quality=quality, pixel_format=TJPF_BGR)
+        except Exception:
+            pass
+    ok, enc = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), quality,
+                                         int(cv2.IMWRITE_JPEG_OPTIMIZE), 0])
+    return enc.tobytes() if ok else None
+
+class _LazyJSON:
+    """Log argument that is only serialized if the record is emitted."""
+    __slots__ = ("o",)
+    def __init__(self, o): self.o = o
+    def __str__(self): return _json_dumps(self.o)
+
+# Dry-run previews handed out by URL (?preview=1): token -> (expires, jpeg)
+_PREVIEWS: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+_PREVIEW_TTL_S = 120.0
+_PREVIEW_MAX = 8
+_preview_lock = threading.Lock()
+
+def _store_preview(jpg: bytes) -> str:
+    token = uuid.uuid4().hex
+    now = time.monotonic()
+    with _preview_lock:
+        _PREVIEWS[token] = (now + _PREVIEW_TTL_S, jpg)
+        while len(_PREVIEWS) > _PREVIEW_MAX or (_PREVIEWS and next(iter(_PREVIEWS.values()))[0] < now):
+            _PREVIEWS.popitem(last=False)
+    return token
+
+# Parsed YAML by path, reused until the file's (mtime_ns, size) changes
+_YAML_CACHE: OrderedDict[str, tuple[int, int, dict]] = OrderedDict()
+_YAML_CACHE_MAX = 8
+_cache_lock = threading.Lock()
+
+def _load_yaml_cached(p: str) -> dict:
+    """Parsed contents of `p` (a private deep copy). Raises FileNotFoundError."""
+    st = os.stat(p)
+    key = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        hit = _YAML_CACHE.get(p)
+        if hit is not None and hit[:2] == key:
+            _YAML_CACHE.move_to_end(p)
+            return copy.deepcopy(hit[2])
+    with open(p, "r") as f:
+        data = yaml.load(f, Loader=_YAML_LOADER) or {}
+    _cache_put(p, key, data)
+    return copy.deepcopy(data)
+
+def _cache_put(p: str, key: tuple[int, int], data: dict) -> None:
+    with _cache_lock:
+        _YAML_CACHE[p] = (key[0], key[1], data)
+        _YAML_CACHE.move_to_end(p)
+        while len(_YAML_CACHE) > _YAML_CACHE_MAX:
+            _YAML_CACHE.popitem(last=False)
+
 # --- Panel monitor API ---
 @ocr_bp.get("/api/panel/status")
 def api_panel_status():
@@ -41,7 +211,9 @@ def _rois_path():
 # Helpers to read/write YAML
 def _read_rois_file():
     p = _rois_path()
-    if not os.path.exists(p):
+    try:
+        return _load_yaml_cached(p)
+    except FileNotFoundError:
         return {
             "lcd_rois": {"lcd1":None,"lcd2":None,},
             "led_rois": {"opr_ctrl":None,"interlck":None,"ptfi":None,"flame":None,"alarm":None},
@@ -50,14 +222,25 @@ def _read_rois_file():
             "lcd_inverted": True,
             "led_red_thresh": {"sat":110,"val":120},
         }
-    with open(p, "r") as f:
-        return yaml.safe_load(f) or {}
 
 def _write_rois_file(data):
-    with open(_rois_path(), "w") as f:
-        yaml.safe_dump(data, f, sort_keys=False)
+    p = _rois_path()
+    with open(p, "w") as f:
+        yaml.dump(data, f, Dumper=_YAML_DUMPER, sort_keys=False)
+    # what we just wrote is what a re-parse would return
+    st = os.stat(p)
+    _cache_put(p, (st.st_mtime_ns, st.st_size), copy.deepcopy(data))
+
+def _rois_sig() -> str:
+    # same key the ROI cache uses; "none" while the defaults are served
+    try:
+        st = os.stat(_rois_path())
+    except FileNotFoundError:
+        return "none"
+    return f"{st.st_mtime_ns}-{st.st_size}"
 
 @ocr_bp.get("/api/panel/rois")
+@etag(_rois_sig)
 def api_panel_rois_get():
     return jsonify(_read_rois_file())
 
@@ -68,7 +251,8 @@ def api_panel_rois_set():
     for k in ("lcd_rois", "led_rois"):
         if k not in data or not isinstance(data[k], dict):
             return jsonify({"error": f"Missing or invalid {k}"}), 400
-    # write yaml
+    # write yaml; merge into the current file (a stat-validated cache hit
+    # unless it changed on disk, e.g. a rollback or a hand edit)
     cur = _read_rois_file()
     cur.update({
         "lcd_rois": data["lcd_rois"],
@@ -95,50 +279,145 @@ def api_panel_snapshot():
             return resp
     return jsonify({"error": "No snapshot available (worker not running)"}), 503
 
+@ocr_bp.get("/api/panel/preview/<token>")
+def api_panel_preview(token: str):
+    with _preview_lock:
+        hit = _PREVIEWS.get(token)
+    if not hit or hit[0] < time.monotonic():
+        return jsonify({"error": "preview expired"}), 404
+    resp = current_app.response_class(hit[1], mimetype="image/jpeg")
+    resp.headers["Cache-Control"] = "private, max-age=60"
+    return resp
+
+# --- Dry-run helpers (module level so they are built once, not per request)
+_ROI_KEYS = ("x1", "y1", "x2", "y2")
+
+@lru_cache(maxsize=64)
+def _norm_roi_t(t: tuple) -> tuple[int, int, int, int] | None:
+    try:
+        return tuple(int(c) for c in t)
+    except Exception:
+        return None
+
+def _norm_roi(v):
+    if not v: return None
+    if isinstance(v, dict):
+        t = tuple(v.get(k, 0) for k in _ROI_KEYS)
+    elif isinstance(v, (list, tuple)) and len(v) == 4:
+        t = tuple(v)
+    else:
+        return None
+    try:
+        r = _norm_roi_t(t)
+    except TypeError:  # unhashable junk in the YAML
+        return None
+    return dict(zip(_ROI_KEYS, r)) if r else None
+
+def _crop(img, roi):
+    if img is None or roi is None:
+        return None
+    x1, y1, x2, y2 = int(roi["x1"]), int(roi["y1"]), int(roi["x2"]), int(roi["y2"])
+    h, w = img.shape[:2]
+    x1 = max(0, min(w, x1)); x2 = max(0, min(w, x2))
+    y1 = max(0, min(h, y1)); y2 = max(0, min(h, y2))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return img[y1:y2, x1:x2]  # view; ROIs are only read
+
+# The colour tests take HSV tiles cut from one shared conversion (see dry run)
+def _roi_bright_on_black(hsv, val_thr=140, sat_min=30, frac_thr=0.08):
+    if hsv is None or hsv.size == 0: return False
+    v = hsv[...,2]; s = hsv[...,1]
+    mask = (v > int(val_thr)) & (s >= int(sat_min))
+    frac = cv2.countNonZero(mask.view(np.uint8)) / float(mask.size)
+    return frac > float(frac_thr)
+
+def _led_on_hsv(hsv, sat_thr=110, val_thr=120, frac_thr=0.12):
+    if hsv is None or hsv.size == 0: return False
+    # red (both ends of the hue wheel) or green, bright and saturated enough
+    s_min, v_min = _led_sv_min(int(sat_thr), int(val_thr))
+    mask = _LED_HUE_OK[hsv[...,0]] & (hsv[...,1] >= s_min) & (hsv[...,2] >= v_min)
+    frac = cv2.countNonZero(mask.view(np.uint8)) / float(mask.size)
+    return frac > float(frac_thr)
+
+def _read_lcd_via_ssocr(img_bgr, digits: int, hint: str | None,
+                        dark_std: float = 5.0, dark_mean: float = 20.0):
+    """
+    Call ssocr and adapt its output to (value, [per-digit confs]) just like read_lcd_roi.
+    - Pads/truncates to `digits`
+    - Synthesizes simple confidences (0.75 for a 0-9, 0.5 for blank/other)
+    """
+    if img_bgr is None or getattr(img_bgr, "size", 0) == 0:
+        return "", []
+    if _roi_is_dark(img_bgr, dark_std, dark_mean):
+        return "", [0.0] * digits
+
+    # Prefer red filtering if you pass "red" (or any truthy) in `hint`
+    expect_color = "red" if (hint and str(hint).lower().startswith("r")) else None
+
+    # Call your wrapper. If your wrapper only returns a string, the `try/except` handles it.
+    try:
+        text, meta = ssocr_read_digits(
+            img_bgr,
+            digits=digits,
+            expect_color=expect_color,   # wrapper can ignore if unsupported
+            invert=False,                # most red LED/LCDs render as bright-on-dark
+            threshold="otsu",            # let wrapper choose default if not supported
+            extra_args=None,             # room for tuning (erosion, despeckle, etc.)
+        )
+    except TypeError:
+        # Backward compatibility with a simpler signature
+        text = ssocr_read_digits(img_bgr, digits=digits)
+        meta = {}
+
+    # Normalize to exactly `digits` chars (spaces for blanks)
+    text = (text or "")
+    if digits and len(text) != digits:
+        text = text[:digits].ljust(digits, " ")
+
+    # Super-simple confidences; you can upgrade this using `meta` if your wrapper returns scores
+    confs = [0.75 if ch.isdigit() else 0.5 for ch in text]
+    return text, confs
+
 @ocr_bp.post("/api/panel/dry_run")
 def api_panel_dry_run():
     """
-    Debug-first dry-run OCR/LED decode for an uploaded snapshot.
+    Debug-first dry-run OCR/LED decode for an uploaded snapshot, sent either
+    as a raw image/* body or as multipart field "image".
     Logs everything to server logs so you can see exactly what's happening.
     """
     log = current_app.logger
+    info_on = log.isEnabledFor(logging.INFO)  # skip building per-ROI debug args otherwise
 
     t0 = time.time()
-    f = request.files.get("image")
-    if not f:
-        log.error("[dry_run] no image provided")
-        return jsonify(error="no image provided"), 400
-    data = f.read()
+    if request.mimetype.startswith("image/"):
+        # raw body upload: skips multipart boundary parsing of the whole image
+        data = request.get_data(cache=False)
+    else:
+        f = request.files.get("image")
+        if not f:
+            log.error("[dry_run] no image provided")
+            return jsonify(error="no image provided"), 400
+        data = f.read()
     if not data:
         log.error("[dry_run] empty image payload")
         return jsonify(error="empty image"), 400
 
-    arr = np.frombuffer(data, np.uint8)
-    bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    if bgr is None:
-        log.error("[dry_run] cv2.imdecode failed")
-        return jsonify(error="decode failed"), 400
-    H, W = bgr.shape[:2]
-    log.info("[dry_run] image decoded: %dx%d", W, H)
-
-    # --- Load ROIs from the configured single path
-    rois_path = current_app.config.get("PANEL_ROIS_PATH", "panel_rois.yaml")
+    # --- Load ROIs through the same cached reader as /api/panel/rois
+    rois_path = _rois_path()
     abs_path = os.path.abspath(rois_path)
     exists = os.path.exists(rois_path)
     log.info("[dry_run] ROI path: %s (abs=%s) exists=%s", rois_path, abs_path, exists)
-
-    cfg = {}
-    if exists:
-        try:
-            with open(rois_path, "r") as fh:
-                cfg = yaml.safe_load(fh) or {}
-            log.info("[dry_run] YAML loaded with keys: %s", list(cfg.keys()))
-        except Exception as e:
-            log.exception("[dry_run] failed to load YAML from %s: %r", rois_path, e)
-            return jsonify(error=f"failed to load YAML: {e}"), 500
-    else:
+    if not exists:
         log.warning("[dry_run] ROI YAML not found at %s", abs_path)
 
+    try:
+        cfg = _read_rois_file()
+        log.info("[dry_run] YAML loaded with keys: %s", list(cfg))
+    except Exception as e:
+        log.exception("[dry_run] failed to load YAML from %s: %r", rois_path, e)
+        return jsonify(error=f"failed to load YAML: {e}"), 500
+
     # --- Defaults (align with monitor)
     cfg.setdefault("lcd_rois", {"lcd1": None, "lcd2": None, })
     cfg.setdefault("lcd_sign_rois", {"lcd1": None, "lcd2": None})
@@ -154,33 +433,62 @@ def api_panel_dry_run():
     def _choose_method_for(key: str) -> str:
         return lcd_method_per.get(key, lcd_method_default)
 
-    # --- Normalize ROIs
-    def _norm_roi(v):
-        if not v: return None
-        if isinstance(v, dict):
-            try:
-                r = {k:int(v.get(k,0)) for k in ("x1","y1","x2","y2")}
-                return r
-            except Exception:
-                return None
-        if isinstance(v, (list, tuple)) and len(v) == 4:
-            x1,y1,x2,y2 = map(int, v)
-            return {"x1":x1,"y1":y1,"x2":x2,"y2":y2}
-        return None
+    # --- Decode. A JPEG much larger than the ROI reference size is decoded
+    # with libjpeg's scaled IDCT (1/2, 1/4, 1/8); the ROI scaling below uses
+    # the decoded size, so nothing else changes.
+    ref = cfg.get("roi_ref_size") or cfg.get("image_size")
+    flag, reduce_n = cv2.IMREAD_COLOR, 1
+    is_jpeg = data[:2] == b"\xff\xd8"
+    size, orient = _jpeg_info(data) if is_jpeg else (None, 1)
+    # TurboJPEG/jpeg4py ignore EXIF orientation but cv2.imdecode applies it;
+    # rotated/flipped JPEGs (e.g. phone photos) go through cv2 only
+    fast_ok = is_jpeg and orient == 1
+    if size and orient >= 5:  # 90/270 degrees: cv2 returns it transposed
+        size = (size[1], size[0])
+    if size and isinstance(ref, dict) and int(ref.get("w",0)) and int(ref.get("h",0)):
+        w0, h0 = size
+        factor = min(w0 / float(ref["w"]), h0 / float(ref["h"]))
+        for n, f_reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if factor >= n:
+                flag, reduce_n = f_reduced, n
+                log.info("[dry_run] %dx%d JPEG, decoding at 1/%d", w0, h0, n)
+                break
+    arr = np.frombuffer(data, np.uint8)
+    bgr = None
+    if _TJ is not None and fast_ok:
+        # TurboJPEG hands back BGR directly and does the same scaled IDCT
+        try:
+            bgr = _TJ.decode(data, pixel_format=TJPF_BGR,
+                             scaling_factor=(1, reduce_n) if reduce_n > 1 else None)
+        except Exception as e:
+            log.info("[dry_run] TurboJPEG decode failed (%s); falling back", e)
+    if (bgr is None and jpeg4py is not None and flag == cv2.IMREAD_COLOR and fast_ok
+            and current_app.config.get("USE_JPEG4PY", True)):
+        try:
+            bgr = cv2.cvtColor(jpeg4py.JPEG(arr).decode(), cv2.COLOR_RGB2BGR)
+        except Exception as e:  # some JPEGs libjpeg-turbo rejects; OpenCV may still read them
+            log.info("[dry_run] jpeg4py decode failed (%s); using cv2", e)
+    if bgr is None:
+        bgr = cv2.imdecode(arr, flag)
+    if bgr is None:
+        log.error("[dry_run] cv2.imdecode failed")
+        return jsonify(error="decode failed"), 400
+    H, W = bgr.shape[:2]
+    log.info("[dry_run] image decoded: %dx%d", W, H)
 
+    # --- Normalize ROIs
     raw_lcd  = {k:_norm_roi(v) for k,v in (cfg.get("lcd_rois") or {}).items()}
     raw_sign = {k:_norm_roi(v) for k,v in (cfg.get("lcd_sign_rois") or {}).items()}
     raw_led  = {k:_norm_roi(v) for k,v in (cfg.get("led_rois") or {}).items()}
     seg_thr = cfg.get("seg_threshold")
 
-    log.info("[dry_run] raw lcd_rois: %s", json.dumps(raw_lcd))
-    log.info("[dry_run] raw sign_rois: %s", json.dumps(raw_sign))
-    log.info("[dry_run] raw led_rois keys: %s", list(raw_led.keys()))
+    log.info("[dry_run] raw lcd_rois: %s", _LazyJSON(raw_lcd))
+    log.info("[dry_run] raw sign_rois: %s", _LazyJSON(raw_sign))
+    log.info("[dry_run] raw led_rois keys: %s", list(raw_led))
     log.info("[dry_run] seg_threshold=%.2f", seg_thr)
     
 
     # --- Scaling using roi_ref_size (if present)
-    ref = cfg.get("roi_ref_size") or cfg.get("image_size")
     if isinstance(ref, dict) and int(ref.get("w",0)) and int(ref.get("h",0)):
         sx = float(W) / float(ref["w"])
         sy = float(H) / float(ref["h"])
@@ -189,112 +497,65 @@ def api_panel_dry_run():
         sx = sy = 1.0
         log.info("[dry_run] no roi_ref_size found; using sx=sy=1.0")
 
-    def _scale_roi(r):
-        if not r: return None
-        x1 = int(round(r["x1"] * sx)); y1 = int(round(r["y1"] * sy))
-        x2 = int(round(r["x2"] * sx)); y2 = int(round(r["y2"] * sy))
-        x1 = max(0, min(W, x1)); x2 = max(0, min(W, x2))
-        y1 = max(0, min(H, y1)); y2 = max(0, min(H, y2))
-        if x2 <= x1 or y2 <= y1:
-            return None
-        return {"x1":x1,"y1":y1,"x2":x2,"y2":y2}
-
-    lcd_rois  = {k:_scale_roi(v) for k,v in raw_lcd.items()}
-    sign_rois = {k:_scale_roi(v) for k,v in raw_sign.items()}
-    led_rois  = {k:_scale_roi(v) for k,v in raw_led.items()}
-
-    log.info("[dry_run] scaled lcd_rois: %s", json.dumps(lcd_rois))
-    log.info("[dry_run] scaled sign_rois: %s", json.dumps(sign_rois))
+    # Scale + clamp every ROI in one (N,4) array op; empty/degenerate -> None
+    roi_groups = (raw_lcd, raw_sign, raw_led)
+    flat = [r for g in roi_groups for r in g.values()]
+    coords = np.array([[r["x1"],r["y1"],r["x2"],r["y2"]] if r else [0,0,0,0] for r in flat],
+                      dtype=np.float64).reshape(-1, 4)
+    scaled = np.rint(coords * (sx, sy, sx, sy)).astype(np.int32)
+    np.clip(scaled, 0, (W, H, W, H), out=scaled)
+    valid = (scaled[:,2] > scaled[:,0]) & (scaled[:,3] > scaled[:,1])
+    out = iter([{"x1":x1,"y1":y1,"x2":x2,"y2":y2} if (r and ok) else None
+                for r, ok, (x1,y1,x2,y2) in zip(flat, valid.tolist(), scaled.tolist())])
+    lcd_rois, sign_rois, led_rois = ({k: next(out) for k in g} for g in roi_groups)
+
+    log.info("[dry_run] scaled lcd_rois: %s", _LazyJSON(lcd_rois))
+    log.info("[dry_run] scaled sign_rois: %s", _LazyJSON(sign_rois))
     # Log LED ROIs individually to avoid very long lines if many
-    for name, r in led_rois.items():
-        log.info("[dry_run] scaled led_roi[%s]: %s", name, r)
-
-    def _crop(img, roi):
-        if img is None or roi is None:
-            return None
-        x1, y1, x2, y2 = int(roi["x1"]), int(roi["y1"]), int(roi["x2"]), int(roi["y2"])
-        h, w = img.shape[:2]
-        x1 = max(0, min(w, x1)); x2 = max(0, min(w, x2))
-        y1 = max(0, min(h, y1)); y2 = max(0, min(h, y2))
-        if x2 <= x1 or y2 <= y1:
-            return None
-        return img[y1:y2, x1:x2].copy()
-
-    def _roi_bright_on_black(bgr_roi, val_thr=140, sat_min=30, frac_thr=0.08):
-        if bgr_roi is None or bgr_roi.size == 0: return False
-        hsv = cv2.cvtColor(bgr_roi, cv2.COLOR_BGR2HSV)
-        v = hsv[...,2]; s = hsv[...,1]
-        mask = (v > int(val_thr)) & (s >= int(sat_min))
-        frac = float(mask.mean())
-        return frac > float(frac_thr)
-
-    def _led_on_any(bgr_roi, sat_thr=110, val_thr=120, frac_thr=0.12):
-        if bgr_roi is None or bgr_roi.size == 0: return False
-        hsv = cv2.cvtColor(bgr_roi, cv2.COLOR_BGR2HSV)
-        m1 = cv2.inRange(hsv, np.array([0,   max(60,sat_thr-50), max(70,val_thr-50)], np.uint8), np.array([10, 255, 255], np.uint8))
-        m2 = cv2.inRange(hsv, np.array([170, max(60,sat_thr-50), max(70,val_thr-50)], np.uint8), np.array([180,255, 255], np.uint8))
-        mg = cv2.inRange(hsv, np.array([40,  max(60,sat_thr-50), max(70,val_thr-50)], np.uint8), np.array([90, 255, 255], np.uint8))
-        mask = m1 | m2 | mg
-        frac = float((mask > 0).mean())
-        return frac > float(frac_thr)
-    
-    def _read_lcd_via_ssocr(img_bgr, digits: int, hint: str | None):
-        """
-        Call ssocr and adapt its output to (value, [per-digit confs]) just like read_lcd_roi.
-        - Pads/truncates to `digits`
-        - Synthesizes simple confidences (0.75 for a 0-9, 0.5 for blank/other)
-        """
-        if img_bgr is None or getattr(img_bgr, "size", 0) == 0:
-            return "", []
-
-        # Prefer red filtering if you pass "red" (or any truthy) in `hint`
-        expect_color = "red" if (hint and str(hint).lower().startswith("r")) else None
-
-        # Call your wrapper. If your wrapper only returns a string, the `try/except` handles it.
-        try:
-            text, meta = ssocr_read_digits(
-                img_bgr,
-                digits=digits,
-                expect_color=expect_color,   # wrapper can ignore if unsupported
-                invert=False,                # most red LED/LCDs render as bright-on-dark
-                threshold="otsu",            # let wrapper choose default if not supported
-                extra_args=None,             # room for tuning (erosion, despeckle, etc.)
-            )
-        except TypeError:
-            # Backward compatibility with a simpler signature
-            text = ssocr_read_digits(img_bgr, digits=digits)
-            meta = {}
-
-        # Normalize to exactly `digits` chars (spaces for blanks)
-        text = (text or "")
-        if digits and len(text) != digits:
-            text = text[:digits].ljust(digits, " ")
-
-        # Super-simple confidences; you can upgrade this using `meta` if your wrapper returns scores
-        confs = [0.75 if ch.isdigit() else 0.5 for ch in text]
-        return text, confs
+    if info_on:
+        for name, r in led_rois.items():
+            log.info("[dry_run] scaled led_roi[%s]: %s", name, r)
 
     digits   = int(cfg.get("digit_count_per_lcd", 4))
     seg_thr  = float(cfg.get("seg_threshold", 0.35))
     hints    = cfg.get("lcd_color_hint") or {}
     led_thr  = cfg.get("led_thr", {"sat":110,"val":120,"frac":0.12})
     lcd_invert = cfg.get("ssocr_read_digits", False)
+    dark_std  = float(cfg.get("ssocr_skip_dark_std", 5.0))
+    dark_mean = float(cfg.get("ssocr_skip_dark_mean", 20.0))
     #sign_thr = cfg.get("sign_thr", {"val":140,"sat_min":30,"frac":0.08})
 
+    # One HSV conversion for every colour-tested ROI (LEDs, signs), over the
+    # box that encloses them rather than the whole frame; tiles are views.
+    hsv_boxes = [r for r in (*led_rois.values(), *sign_rois.values()) if r]
+    if hsv_boxes:
+        ux1 = min(r["x1"] for r in hsv_boxes); uy1 = min(r["y1"] for r in hsv_boxes)
+        ux2 = max(r["x2"] for r in hsv_boxes); uy2 = max(r["y2"] for r in hsv_boxes)
+        hsv_full = cv2.cvtColor(bgr[uy1:uy2, ux1:ux2], cv2.COLOR_BGR2HSV)
+
+    def _hsv_crop(roi):
+        if not roi: return None
+        return hsv_full[roi["y1"]-uy1:roi["y2"]-uy1, roi["x1"]-ux1:roi["x2"]-ux1]
+
     # --- Decode LCDs, signs, LEDs with detailed logs
     lcd_vals = []
     for key in ("lcd1","lcd2"):
         roi = lcd_rois.get(key)
         crop = _crop(bgr, roi)
-        log.info("[dry_run] LCD %s roi=%s crop=%s", key, roi, crop.shape if crop is not None else None)
+        if info_on:
+            log.info("[dry_run] LCD %s roi=%s crop=%s", key, roi, crop.shape if crop is not None else None)
         # Per-LCD digits/threshold/hint fallbacks
         hint = (hints or {}).get(key)  # e.g. "red" to enable red gating in Method 1
 
         method = _choose_method_for(key)
-        if method == "ssocr":
+        if method == "ssocr" and crop is not None and crop.size and _roi_is_dark(crop, dark_std, dark_mean):
+            # Display off: skip the four binarize/decode passes
+            log.info("[dry_run] LCD %s (ssocr) dark ROI, skipped", key)
+            lcd_vals.append("")
+        elif method == "ssocr":
             # Method 2: “ssocr-style”
             text, meta = ssocr_read_digits(
-                crop,
+                np.ascontiguousarray(crop) if crop is not None else None,
                 digits=digits,
                 invert=lcd_invert,           # flip to True if the display is dark-on-light
                 threshold="otsu",       # can be int like 170, or "otsu"
@@ -311,13 +572,14 @@ def api_panel_dry_run():
                 hint=hint,          # "red" enables the red gate; anything else = plain gray
                 seg_thr=seg_thr,    # falls back to DEFAULT_SEG_THR inside if None
             )
-            log.info("[dry_run] LCD %s (ratio) -> '%s' confs=%s", key, text, [round(c, 3) for c in confs])
+            if info_on:
+                log.info("[dry_run] LCD %s (ratio) -> '%s' confs=%s", key, text, [round(c, 3) for c in confs])
             lcd_vals.append(text or "")
 
     #signs_on = {}
     #for key in ("lcd1","lcd2"):
     #    sroi = sign_rois.get(key)
-    #    scrop = _crop(bgr, sroi)
+    #    scrop = _hsv_crop(sroi)
     #    on = _roi_bright_on_black(scrop,
     #                              val_thr=sign_thr.get("val",140),
     #                              sat_min=sign_thr.get("sat_min",30),
@@ -331,31 +593,46 @@ def api_panel_dry_run():
 
     leds = {}
     for name, roi in led_rois.items():
-        crop = _crop(bgr, roi)
-        on = _led_on_any(crop,
+        crop = _hsv_crop(roi)
+        on = _led_on_hsv(crop,
                          sat_thr=int(led_thr.get("sat",110)),
                          val_thr=int(led_thr.get("val",120)),
                          frac_thr=float(led_thr.get("frac",0.12)))
-        log.info("[dry_run] LED %-10s roi=%s crop=%s -> %s",
-                 name, roi, crop.shape if crop is not None else None, on)
+        if info_on:
+            log.info("[dry_run] LED %-10s roi=%s crop=%s -> %s",
+                     name, roi, crop.shape if crop is not None else None, on)
         leds[name] = bool(on)
 
-    # --- Annotated preview
-    dbg = bgr.copy()
-    def box(img, r, color, label=None):
-        if not r: return
-        cv2.rectangle(img, (r["x1"], r["y1"]), (r["x2"], r["y2"]), color, 2)
-        if label:
-            cv2.putText(img, str(label), (r["x1"], max(0, r["y1"]-6)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
-
-    for i,k in enumerate(("lcd1","lcd2"), 1):
-        box(dbg, lcd_rois.get(k),  (255,160,20), f"{k}:{lcd_vals[i-1] or ''}")
-        box(dbg, sign_rois.get(k), ( 30,220,30), f"{k}-sign")
-    for name, r in led_rois.items():
-        box(dbg, r, (40,140,255), f"{name}:{'on' if leds.get(name) else 'off'}")
-
-    ok, enc = cv2.imencode(".jpg", dbg, [int(cv2.IMWRITE_JPEG_QUALITY), 75])
-    preview_b64 = base64.b64encode(enc.tobytes()).decode("ascii") if ok else None
+    # --- Annotated preview. ?preview=0 skips drawing/encoding; ?preview=1
+    # returns a short-lived URL instead of base64 in the JSON body.
+    preview_mode = request.args.get("preview", "")
+    preview_b64 = preview_url = None
+    if preview_mode != "0":
+        # drawn in place; bgr is not read after this
+        dbg = bgr
+        # one polylines() call per colour group; labels still need a putText each
+        groups = {(255,160,20): [], (30,220,30): [], (40,140,255): []}
+        for i,k in enumerate(("lcd1","lcd2"), 1):
+            groups[(255,160,20)].append((lcd_rois.get(k), f"{k}:{lcd_vals[i-1] or ''}"))
+            groups[(30,220,30)].append((sign_rois.get(k), f"{k}-sign"))
+        for name, r in led_rois.items():
+            groups[(40,140,255)].append((r, f"{name}:{'on' if leds.get(name) else 'off'}"))
+
+        font, scale, th = cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
+        for color, items in groups.items():
+            items = [(r, label) for r, label in items if r]
+            if not items: continue
+            pts = np.array([[(r["x1"],r["y1"]), (r["x2"],r["y1"]), (r["x2"],r["y2"]), (r["x1"],r["y2"])]
+                            for r, _ in items], dtype=np.int32)
+            cv2.polylines(dbg, pts, True, color, th, cv2.LINE_8)
+            for r, label in items:
+                cv2.putText(dbg, label, (r["x1"], max(0, r["y1"]-6)), font, scale, color, th, cv2.LINE_AA)
+
+        enc = _encode_jpeg(dbg, 75)
+        if enc and preview_mode == "1":
+            preview_url = url_for("config_ui.api_panel_preview", token=_store_preview(enc))
+        elif enc:
+            preview_b64 = _b64_str(enc)
 
     dbg_out = {
         "roi_path": abs_path,
@@ -370,4 +647,5 @@ def api_panel_dry_run():
     }
     log.info("[dry_run] result lcds=%s leds=%s elapsed=%dms", lcd_vals, leds, dbg_out["elapsed_ms"])
 
-    return jsonify({"lcds": lcd_vals, "leds": leds, "preview_jpeg_b64": preview_b64, "debug": dbg_out})
\ No newline at end of file
+    return _json_response({"lcds": lcd_vals, "leds": leds, "preview_jpeg_b64": preview_b64,
+                           "preview_url": preview_url, "debug": dbg_out})
\ No newline at end of file
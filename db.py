@@ -1,7 +1,10 @@
+from flask import g, current_app
 from flask_sqlalchemy import SQLAlchemy
-import json
+import json, logging, queue, threading, time
 from datetime import datetime, timezone
-from sqlalchemy import text
+from sqlalchemy import text, event
+from sqlalchemy.orm import Session, object_session
+from services.etag import bump_version, data_version
 
 db = SQLAlchemy()
 
@@ -54,7 +57,7 @@ class Settings(db.Model):
 class AlertHistory(db.Model):
     __tablename__ = "alert_history"
     id           = db.Column(db.Integer, primary_key=True)
-    ts           = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    ts           = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
     alert_type   = db.Column(db.String(50), nullable=False)
     sensor       = db.Column(db.String(50), nullable=True)
     sensor_val   = db.Column(db.String(50), nullable=True)
@@ -63,15 +66,71 @@ class AlertHistory(db.Model):
     error_text   = db.Column(db.Text, nullable=True)
     payload_json = db.Column(db.Text, nullable=True)
 
+# Alert history rows are queued and written in batches by one background
+# thread, so an alert burst costs one commit instead of one per channel
+_HISTORY_Q: "queue.SimpleQueue[dict | None]" = queue.SimpleQueue()
+_HISTORY_BATCH = 50
+_HISTORY_FLUSH_S = 0.1
+_history_writer: threading.Thread | None = None
+_history_lock = threading.Lock()
+
+def _write_history(rows: list[dict]):
+    db.session.add_all([AlertHistory(**r) for r in rows])
+    db.session.commit()
+
+def _history_writer_loop(app):
+    log = logging.getLogger(__name__)
+    stop = False
+    while not stop:
+        rows = [_HISTORY_Q.get()]
+        time.sleep(_HISTORY_FLUSH_S)  # let the rest of a burst arrive
+        while len(rows) < _HISTORY_BATCH:
+            try:
+                rows.append(_HISTORY_Q.get_nowait())
+            except queue.Empty:
+                break
+        stop = None in rows
+        rows = [r for r in rows if r is not None]
+        if not rows:
+            continue
+        with app.app_context():
+            try:
+                _write_history(rows)
+            except Exception:
+                db.session.rollback()
+                log.warning("Alert history write failed (%d rows).", len(rows), exc_info=True)
+
+def _ensure_history_writer(app):
+    global _history_writer
+    with _history_lock:
+        if _history_writer is None or not _history_writer.is_alive():
+            _history_writer = threading.Thread(target=_history_writer_loop, args=(app,),
+                                               name="alert-history", daemon=True)
+            _history_writer.start()
+
 def log_alert_history(alert_type:str, sensor:str, sensor_val:str, channel:str, status:str, error_text:str|None=None, payload:dict|None=None):
-    entry = AlertHistory(
+    row = dict(
+        ts=datetime.now(timezone.utc),
         alert_type=alert_type, sensor=sensor, sensor_val=sensor_val,
         channel=channel, status=status,
         error_text=(error_text or None),
         payload_json=(json.dumps(payload) if payload else None),
     )
-    db.session.add(entry)
-    db.session.commit()
+    app = current_app._get_current_object()
+    if app.testing or app.config.get("ALERT_HISTORY_SYNC"):
+        _write_history([row])
+        return
+    _ensure_history_writer(app)
+    _HISTORY_Q.put(row)
+
+def flush_alert_history(timeout: float = 2.0):
+    """Stop the history writer after it has written whatever is queued."""
+    global _history_writer
+    with _history_lock:
+        t, _history_writer = _history_writer, None
+    if t is not None and t.is_alive():
+        _HISTORY_Q.put(None)
+        t.join(timeout)
 
 def get_or_create_settings() -> Settings:
     s = Settings.query.get(1)
@@ -81,6 +140,13 @@ def get_or_create_settings() -> Settings:
         db.session.commit()
     return s
 
+def get_settings_cached() -> Settings:
+    # one Settings lookup per request/app context
+    s = g.get("settings")
+    if s is None:
+        s = g.settings = get_or_create_settings()
+    return s
+
 def alert_history_as_dict(a) -> dict:
     ts = a.ts
     if ts is not None and ts.tzinfo is None:
@@ -142,15 +208,74 @@ def recipient_as_dict(r: Recipient) -> dict:
         "created_at": r.created_at.isoformat(),
     }
 
+# Serialized recipients, rebuilt when the "recipients" change counter moves
+# (it and "settings" also key the /api ETags). The counter is bumped here, not by callers: ORM writes mark their session
+# and the bump happens once that session commits (so a concurrent rebuild
+# can't cache pre-commit rows under the new version).
+_RECIPIENTS_CACHE: dict = {"ver": None, "data": None}
+_VERSIONED = {Recipient: "recipients", Settings: "settings"}
+
+def _mark_changed(_mapper, _conn, target):
+    sess = object_session(target)
+    if sess is not None:
+        sess.info.setdefault("changed_versions", set()).add(_VERSIONED[type(target)])
+
+for _model in _VERSIONED:
+    for _ev in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _ev, _mark_changed)
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_changed(state):
+    # ORM-enabled update()/delete() statements skip the mapper events
+    if state.is_update or state.is_delete:
+        m = state.bind_mapper
+        name = _VERSIONED.get(m.class_) if m is not None else None
+        if name:
+            state.session.info.setdefault("changed_versions", set()).add(name)
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed(sess):
+    for name in sess.info.pop("changed_versions", ()):
+        bump_version(name)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changed(sess):
+    sess.info.pop("changed_versions", None)
+
+def invalidate_caches() -> None:
+    """Drop every DB-derived cache, e.g. after the database file was restored."""
+    for name in set(_VERSIONED.values()):
+        bump_version(name)
+
 def recipients_as_list() -> list[dict]:
-    recs = Recipient.query.order_by(Recipient.name.asc()).all()
-    return [recipient_as_dict(r) for r in recs]
+    ver = data_version("recipients")
+    if _RECIPIENTS_CACHE["ver"] != ver:
+        recs = Recipient.query.order_by(Recipient.name.asc()).all()
+        _RECIPIENTS_CACHE["data"] = [recipient_as_dict(r) for r in recs]
+        _RECIPIENTS_CACHE["ver"] = ver
+    return [dict(r) for r in _RECIPIENTS_CACHE["data"]]
 
 def load_settings_dict() -> dict:
     return settings_as_dict(get_or_create_settings())
 
+def _set_sqlite_pragmas(dbapi_conn, _conn_record):
+    # WAL lets readers run alongside a writer; NORMAL skips the per-commit
+    # fsync of the rollback journal (still durable at checkpoint)
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA mmap_size=67108864")
+    cur.execute("PRAGMA cache_size=-20000")
+    cur.close()
+
 def init_db(app):
     db.init_app(app)
     with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            event.listen(db.engine, "connect", _set_sqlite_pragmas)
         db.create_all()
+        # create_all() leaves existing tables alone; add the history index there too
+        db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_alert_history_ts ON alert_history (ts)"))
+        db.session.commit()
         get_or_create_settings()
\ No newline at end of file
@@ -1,54 +1,111 @@
 from __future__ import annotations
 import os
+import logging
 import tarfile
 import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import shutil
 import subprocess as sp
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 
 # Show this in the UI; keep it human-friendly.
 REPO_SLUG = "accunettech/firepi_zero"
 RAW_VERSION_URL = f"https://raw.githubusercontent.com/{REPO_SLUG}/main/VERSION"
 TARBALL_URL = f"https://codeload.github.com/{REPO_SLUG}/tar.gz/refs/heads/main"
 
+@lru_cache(maxsize=32)
+def _which(prog: str) -> str:
+    return shutil.which(prog) or prog
+
 def _safe_run(cmd: list[str], *, cwd: Optional[str] = None, timeout: int = 60) -> Tuple[int, str, str]:
+    # absolute program path: the child execs once instead of trying each $PATH entry
+    argv = cmd if os.sep in cmd[0] else [_which(cmd[0]), *cmd[1:]]
     try:
         p = sp.Popen(
-            cmd, cwd=cwd, stdout=sp.PIPE, stderr=sp.PIPE, text=True
+            argv, cwd=cwd, stdin=sp.DEVNULL, stdout=sp.PIPE, stderr=sp.PIPE, text=True
         )
-        out, err = p.communicate(timeout=timeout)
-        return p.returncode, out or "", err or ""
     except Exception as e:
         return 127, "", f"{type(e).__name__}: {e}"
+    try:
+        out, err = p.communicate(timeout=timeout)
+    except sp.TimeoutExpired:
+        p.kill()
+        out, err = p.communicate()
+        return 124, out or "", f"{err or ''}Timed out after {timeout}s"
+    return p.returncode, out or "", err or ""
 
+@lru_cache(maxsize=4)
 def _app_root(app) -> Path:
     return Path(app.root_path).resolve()
 
+_LOG_DIRS: set[Path] = set()  # already created this process
+
 def _log_dir(app) -> Path:
     d = Path(app.config.get("LOG_DIR") or (_app_root(app) / "logs"))
-    d.mkdir(parents=True, exist_ok=True)
+    if d not in _LOG_DIRS:
+        d.mkdir(parents=True, exist_ok=True)
+        _LOG_DIRS.add(d)
     return d
 
+def _newest_file(d: Path, prefix: str, suffix: str = "") -> Optional[Path]:
+    """Most recently modified regular file in `d` named prefix*suffix (one scandir pass)."""
+    best, best_mtime = None, -1.0
+    try:
+        with os.scandir(d) as it:
+            for e in it:
+                if not (e.name.startswith(prefix) and e.name.endswith(suffix)):
+                    continue
+                try:
+                    if not e.is_file():
+                        continue
+                    mtime = e.stat().st_mtime
+                except OSError:
+                    continue
+                if mtime > best_mtime:
+                    best, best_mtime = e.path, mtime
+    except OSError:
+        return None
+    return Path(best) if best else None
+
 def _current_log_path(app) -> Optional[Path]:
     d = _log_dir(app)
     main = d / "app.log"
-    if main.exists() and main.is_file():
+    if main.is_file():
         return main
-    candidates = sorted(
-        (p for p in d.glob("app.log*") if p.is_file()),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True,
-    )
-    return candidates[0] if candidates else None
+    return _newest_file(d, "app.log")
 
-def _read_tail_bytes(p: Path, max_bytes: int = 32_000) -> str:
-    size = p.stat().st_size
+def _read_tail_lines(p: Path, n: int, block: int = 8192, max_bytes: int = 1_000_000) -> list[str]:
+    """Last `n` lines of `p`, reading 8 KiB blocks backwards from EOF."""
+    chunks: list[bytes] = []
+    nl = size = 0
     with p.open("rb") as f:
-        if size > max_bytes:
-            f.seek(size - max_bytes)
-        data = f.read()
-    return data.decode("utf-8", errors="replace")
+        pos = os.fstat(f.fileno()).st_size
+        # n+1 newlines guarantees n complete lines (the last one may be unterminated)
+        while pos > 0 and nl <= n and size < max_bytes:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step)
+            chunks.append(data)
+            nl += data.count(b"\n")
+            size += len(data)
+    buf = b"".join(reversed(chunks)).rstrip(b"\n")
+    if not buf:
+        return []
+    # decode only the kept lines, in one go
+    cut = len(buf)
+    for _ in range(n):
+        cut = buf.rfind(b"\n", 0, cut)
+        if cut < 0:
+            break
+    text = buf[cut + 1:].decode("utf-8", errors="replace")
+    return [ln.rstrip("\r") for ln in text.split("\n")]
 
 def _detect_venv_pip(app) -> Optional[Path]:
     for rel in (".venv/bin/pip", "venv/bin/pip"):
@@ -57,77 +114,201 @@ def _detect_venv_pip(app) -> Optional[Path]:
             return p
     return None
 
+def _flush_log_handlers() -> None:
+    # file handler is buffered; push pending records so the tail is current
+    for h in logging.getLogger().handlers:
+        try:
+            h.flush()
+        except Exception:
+            pass
+
 def get_log_tail_text(app, lines: int = 50) -> str:
+    _flush_log_handlers()
     lf = _current_log_path(app)
     if not lf:
         return "No log file found yet."
-    text = _read_tail_bytes(lf, max_bytes=64_000)
-    last_lines = text.rstrip("\n").splitlines()[-max(1, int(lines)) :]
+    last_lines = _read_tail_lines(lf, max(1, int(lines)))
     return "\n".join(last_lines) + ("\n" if last_lines else "")
 
 def get_full_log_file(app) -> Optional[Path]:
+    _flush_log_handlers()
     return _current_log_path(app)
 
-def get_installed_version(app) -> str:
-    root = _app_root(app)
-    vf = root / "VERSION"
-    if vf.exists():
-        return vf.read_text(encoding="utf-8").strip()
-
-    git_dir = root / ".git"
-    if git_dir.exists() and git_dir.is_dir():
-        rc, out, _ = _safe_run(["git", "rev-parse", "--show-toplevel"], cwd=str(root))
-        top = Path(out.strip()) if rc == 0 and out.strip() else root
-        v2 = top / "VERSION"
-        if v2.exists():
-            return v2.read_text(encoding="utf-8").strip()
+# VERSION path -> (st_mtime_ns, stripped contents)
+_INSTALLED_VER: dict[str, tuple[int, str]] = {}
 
-    return "dev"
+def get_installed_version(app) -> str:
+    vf = _app_root(app) / "VERSION"
+    try:
+        mtime = vf.stat().st_mtime_ns
+    except OSError:
+        # no VERSION file; when the app root holds .git it is the top level anyway
+        return "dev"
+    hit = _INSTALLED_VER.get(str(vf))
+    if hit and hit[0] == mtime:
+        return hit[1]
+    ver = vf.read_text(encoding="utf-8").strip()
+    _INSTALLED_VER[str(vf)] = (mtime, ver)
+    return ver
+
+# Last VERSION fetch: reused for _VER_TTL_S, then revalidated with a conditional GET
+_VER_CACHE: dict = {"etag": None, "mtime": None, "val": None, "ts": 0.0}
+_VER_TTL_S = 60.0
+_ver_lock = threading.Lock()
+
+def _http_get(url: str, headers: dict, timeout: float) -> tuple[int, Any, bytes]:
+    """(status, headers, body) over the pooled keep-alive session; urllib without requests."""
+    try:
+        sess = _http_session()
+    except ImportError:
+        sess = None
+    if sess is not None:
+        r = sess.get(url, headers=headers, timeout=timeout)
+        return r.status_code, r.headers, r.content
+    import urllib.request, urllib.error
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as r:
+            return r.status, r.headers, r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, b""
 
 def get_latest_github_version(timeout: int = 6) -> tuple[Optional[str], Optional[str]]:
     """
     Fetch VERSION from GitHub main branch (raw file).
     Returns (version or None, error or None).
     """
-    import urllib.request
+    with _ver_lock:
+        c = dict(_VER_CACHE)
+    if c["val"] is not None and time.monotonic() - c["ts"] < _VER_TTL_S:
+        return c["val"], None
+
+    headers = {}
+    if c["val"] is not None:
+        if c["etag"]: headers["If-None-Match"] = c["etag"]
+        if c["mtime"]: headers["If-Modified-Since"] = c["mtime"]
     ver: Optional[str] = None
     err: Optional[str] = None
     try:
-        with urllib.request.urlopen(RAW_VERSION_URL, timeout=timeout) as r:
-            if r.status == 200:
-                ver = r.read().decode("utf-8", errors="replace").strip()
-            else:
-                err = f"HTTP {r.status} fetching VERSION"
+        status, rh, body = _http_get(RAW_VERSION_URL, headers, timeout)
+        if status == 200:
+            ver = body.decode("utf-8", errors="replace").strip()
+            with _ver_lock:
+                _VER_CACHE.update(etag=rh.get("ETag"), mtime=rh.get("Last-Modified"),
+                                  val=ver, ts=time.monotonic())
+        elif status == 304 and c["val"] is not None:
+            ver = c["val"]
+            with _ver_lock:
+                _VER_CACHE["ts"] = time.monotonic()
+        else:
+            err = f"HTTP {status} fetching VERSION"
     except Exception as e:
         err = str(e)
     return ver, err
 
+_EXCLUDE_NAMES = frozenset({
+    ".git", ".venv", "venv", "logs",
+    "__pycache__", ".mypy_cache", ".pytest_cache", ".DS_Store",
+})
+_EXCLUDE_SUFFIXES = (".pyc", ".pyo", "~")
+
 def _tar_exclude(name: str) -> bool:
     base = name.strip("/")
-    exclude_names = {
-        ".git", ".venv", "venv", "logs",
-        "__pycache__", ".mypy_cache", ".pytest_cache", ".DS_Store",
-    }
-    parts = set(base.split("/"))
-    if parts & exclude_names:
+    if not _EXCLUDE_NAMES.isdisjoint(base.split("/")):
         return True
-    if base.endswith((".pyc", ".pyo", "~")):
-        return True
-    return False
+    return base.endswith(_EXCLUDE_SUFFIXES)
 
-def _safe_tar_add(tar: tarfile.TarFile, root: Path, rel: Path):
-    arcname = str(rel.as_posix())
-    if _tar_exclude(arcname):
-        return
-    tar.add(str(root / rel), arcname=arcname, recursive=True)
+def _walk_for_backup(root: Path, names: list[str], skip: set[str]):
+    """
+    Yield (abs_path, arcname) for everything to archive, depth-first with
+    os.scandir. Excluded directories are pruned without being entered, and
+    each entry is tested by its own name only (its parents already passed).
+    """
+    stack = [(str(root / n), n) for n in reversed(names)]
+    while stack:
+        path, rel = stack.pop()
+        yield path, rel
+        if not os.path.isdir(path) or os.path.islink(path):
+            continue
+        try:
+            with os.scandir(path) as it:
+                children = sorted(it, key=lambda e: e.name, reverse=True)
+        except OSError:
+            continue
+        for e in children:
+            crel = f"{rel}/{e.name}"
+            if e.name in _EXCLUDE_NAMES or e.name.endswith(_EXCLUDE_SUFFIXES) or crel in skip:
+                continue
+            stack.append((e.path, crel))
 
-def _safe_extract_all(tar: tarfile.TarFile, dest: Path) -> None:
+# tarfile I/O and copy size; the 16 KiB default is syscall-bound on SD cards
+_TAR_BUF = 1 << 20
+
+def _safe_extract_all(tar: tarfile.TarFile, dest: Path, skip: frozenset = frozenset()) -> None:
+    """
+    Pre-filter interpreters: check and extract member by member, so this works
+    on "r|" streams and never holds the full member list.
+    """
     dest = dest.resolve()
-    for member in tar.getmembers():
+    for member in tar:
+        if member.name.removeprefix("./") in skip:
+            continue
         member_path = (dest / member.name).resolve()
-        if not str(member_path).startswith(str(dest)):
+        if not member_path.is_relative_to(dest):
             raise RuntimeError("Blocked path traversal in tar extract")
-    tar.extractall(path=str(dest))
+        if member.islnk() or member.issym():
+            base = dest if member.islnk() else member_path.parent
+            if not (base / member.linkname).resolve().is_relative_to(dest):
+                raise RuntimeError("Blocked link escaping tar extract dir")
+        tar.extract(member, path=str(dest))
+
+def _extract_tar_stream(fh, dest: Path, skip: frozenset = frozenset()) -> None:
+    """
+    Extract a .tar.gz read sequentially from `fh` (file or HTTP response) in
+    one pass. Members named in `skip` are left out.
+    """
+    with tarfile.open(fileobj=fh, mode="r|gz", bufsize=_TAR_BUF, copybufsize=_TAR_BUF) as tar:
+        if hasattr(tarfile, "data_filter"):
+            # the "data" filter rejects traversal/unsafe links as it goes
+            def _filter(member, path):
+                if member.name.removeprefix("./") in skip:
+                    return None
+                return tarfile.data_filter(member, path)
+            tar.extractall(path=str(dest), filter=_filter)
+        else:
+            _safe_extract_all(tar, dest, skip)
+
+def _extract_tar_gz(path: Path, dest: Path, skip: frozenset = frozenset()) -> None:
+    with open(path, "rb", buffering=_TAR_BUF) as fh:
+        _extract_tar_stream(fh, dest, skip)
+
+# The live SQLite db is never archived file by file: in WAL mode committed
+# rows may exist only in -wal, and -shm is mmapped by the running process.
+# backup_app stores a consistent copy as <db>.snapshot instead, and
+# rollback_from_backup loads it back through SQLite's backup API.
+_DB_SNAPSHOT_SUFFIX = ".snapshot"
+
+def _sqlite_db_path(app) -> Optional[Path]:
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+    if not uri.startswith("sqlite:///"):
+        return None
+    p = uri[len("sqlite:///"):].split("?", 1)[0]
+    return Path(p).resolve() if p and p != ":memory:" else None
+
+def _db_member_names(rel_db: str) -> frozenset:
+    return frozenset(rel_db + sfx for sfx in ("", "-wal", "-shm", "-journal"))
+
+def _sqlite_copy(src_path: Path, dst_path: Path) -> None:
+    """Page-level copy under SQLite's own locking (safe while the app writes)."""
+    import sqlite3
+    src = sqlite3.connect(str(src_path), timeout=30)
+    try:
+        dst = sqlite3.connect(str(dst_path), timeout=30)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
 
 def backup_exists(app) -> bool:
     p = Path(app.instance_path) / "firepi_backup.tar.gz"
@@ -136,17 +317,118 @@ def backup_exists(app) -> bool:
     except Exception:
         return False
 
+# GNU tar spelling of _tar_exclude()
+_TAR_EXCLUDE_ARGS = [
+    f"--exclude={pat}" for pat in (
+        ".git", ".venv", "venv", "logs",
+        "__pycache__", ".mypy_cache", ".pytest_cache", ".DS_Store",
+        "*.pyc", "*.pyo", "*~",
+    )
+]
+
+def _kill_all(procs: list) -> None:
+    """Kill and reap child processes (best-effort)."""
+    for p in procs:
+        try:
+            p.kill()
+        except Exception:
+            pass
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except Exception:
+            pass
+
+_PIGZ_THREADS = str(max(1, min(4, os.cpu_count() or 1)))
+
+@contextmanager
+def _tar_gz_writer(path: Path):
+    """
+    Writable TarFile for a .tar.gz at `path`. With pigz installed, tarfile
+    only emits an uncompressed stream ("w|") and pigz compresses it on other
+    cores; otherwise plain in-process "w:gz".
+    """
+    pigz = shutil.which("pigz")
+    if not pigz:
+        with open(path, "wb", buffering=_TAR_BUF) as fh, \
+                tarfile.open(fileobj=fh, mode="w:gz", copybufsize=_TAR_BUF) as tar:
+            yield tar
+        return
+    with open(path, "wb") as fh:
+        proc = sp.Popen([pigz, "-p", _PIGZ_THREADS, "-c"], stdin=sp.PIPE, stdout=fh, stderr=sp.DEVNULL)
+        try:
+            with tarfile.open(fileobj=proc.stdin, mode="w|", bufsize=_TAR_BUF, copybufsize=_TAR_BUF) as tar:
+                yield tar
+        finally:
+            try:
+                proc.stdin.close()
+                rc = proc.wait(timeout=600)
+            except BaseException:
+                _kill_all([proc])
+                raise
+    if rc != 0:
+        raise RuntimeError(f"pigz exited with {rc}")
+
+def _pigz_backup(root: Path, names: list[str], out: Path, excludes: list[str]) -> bool:
+    """
+    tar | pigz: the walk and multi-threaded gzip both run outside Python.
+    Returns False (caller falls back to tarfile) if either tool is missing or fails.
+    """
+    tar_bin, pigz = shutil.which("tar"), shutil.which("pigz")
+    if not tar_bin or not pigz or not names:
+        return False
+    procs: list[sp.Popen] = []
+    try:
+        with open(out, "wb") as fh:
+            tar_p = sp.Popen([tar_bin, "-cf", "-", *_TAR_EXCLUDE_ARGS, *excludes, "--", *names],
+                             cwd=str(root), stdout=sp.PIPE, stderr=sp.DEVNULL)
+            procs.append(tar_p)
+            pigz_p = sp.Popen([pigz, "-p", _PIGZ_THREADS, "-c"], stdin=tar_p.stdout, stdout=fh, stderr=sp.DEVNULL)
+            procs.append(pigz_p)
+            tar_p.stdout.close()  # pigz owns the pipe now
+            pigz_rc = pigz_p.wait(timeout=600)
+            tar_rc = tar_p.wait(timeout=60)
+    except Exception as e:
+        logging.getLogger(__name__).warning("pigz backup failed: %s", e)
+        # the caller's fallback rewrites `out`; nothing may still be writing it
+        _kill_all(procs)
+        return False
+    # tar exits 1 when a file changed while being read (live db/log): still a usable archive
+    return pigz_rc == 0 and tar_rc in (0, 1)
+
 def backup_app(app) -> Path:
     inst = Path(app.instance_path)
     inst.mkdir(parents=True, exist_ok=True)
     backup_path = inst / "firepi_backup.tar.gz"
+    part = backup_path.with_name(backup_path.name + ".part")
 
     root = _app_root(app)
-    with tarfile.open(backup_path, "w:gz") as tar:
-        for p in root.iterdir():
-            rel = p.relative_to(root)
-            _safe_tar_add(tar, root, rel)
+    names = sorted(p.name for p in root.iterdir() if not _tar_exclude(p.name))
+
+    # never archive the backup (or its partial) into itself
+    skip = set()
+    if inst.resolve().is_relative_to(root):
+        rel = inst.resolve().relative_to(root).as_posix()
+        skip = {f"{rel}/{backup_path.name}", f"{rel}/{part.name}"}
+
+    snap = None
+    db_file = _sqlite_db_path(app)
+    if db_file is not None and db_file.is_relative_to(root):
+        skip |= _db_member_names(db_file.relative_to(root).as_posix())
+        if db_file.exists():
+            snap = db_file.with_name(db_file.name + _DB_SNAPSHOT_SUFFIX)
+            snap.unlink(missing_ok=True)
+            _sqlite_copy(db_file, snap)
 
+    try:
+        if not _pigz_backup(root, names, part, [f"--exclude={x}" for x in sorted(skip)]):
+            with _tar_gz_writer(part) as tar:
+                for path, rel in _walk_for_backup(root, names, skip):
+                    tar.add(path, arcname=rel, recursive=False)
+    finally:
+        if snap is not None:
+            snap.unlink(missing_ok=True)
+    os.replace(part, backup_path)
     return backup_path
 
 def rollback_from_backup(app) -> dict:
@@ -155,24 +437,45 @@ def rollback_from_backup(app) -> dict:
     if not backup_path.exists():
         return {"status": "error", "error": "No backup found"}
 
+    # Never extract db files over the open database; restore the snapshot
+    # through SQLite instead (older backups without one keep the live db)
+    db_file = _sqlite_db_path(app)
+    skip, snap = frozenset(), None
+    if db_file is not None and db_file.is_relative_to(root):
+        skip = _db_member_names(db_file.relative_to(root).as_posix())
+        snap = db_file.with_name(db_file.name + _DB_SNAPSHOT_SUFFIX)
+
     try:
-        with tarfile.open(backup_path, "r:gz") as tar:
-            _safe_extract_all(tar, root)
+        _extract_tar_gz(backup_path, root, skip)
+        if snap is not None and snap.is_file():
+            try:
+                _sqlite_copy(snap, db_file)
+            finally:
+                snap.unlink(missing_ok=True)
+            from db import invalidate_caches
+            invalidate_caches()
         return {"status": "ok"}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
+_FETCH_FRESH_S = 60.0
+
 def _git_update(app) -> Tuple[bool, str]:
     root = _app_root(app)
     if not (root / ".git").exists():
         return False, "Not a git repo"
 
-    steps = [
-        (["git", "remote", "-v"], 15),
-        (["git", "fetch", "--all", "--prune"], 120),
-        (["git", "checkout", "-f", "main"], 30),
-        (["git", "reset", "--hard", "origin/main"], 60),
-    ]
+    # Repeat clicks within a minute reuse the last fetch; checkout -B does the
+    # checkout and the hard reset in one process
+    steps = []
+    fetch_head = root / ".git" / "FETCH_HEAD"
+    try:
+        fresh = time.time() - fetch_head.stat().st_mtime < _FETCH_FRESH_S
+    except OSError:
+        fresh = False
+    if not fresh:
+        steps.append((["git", "fetch", "--prune", "origin", "main"], 120))
+    steps.append((["git", "checkout", "-f", "-B", "main", "origin/main"], 60))
 
     logs = []
     ok = True
@@ -185,48 +488,127 @@ def _git_update(app) -> Tuple[bool, str]:
 
     return ok, "\n".join(logs).strip()
 
+_COPY_CHUNK = 1 << 20
+_COPY_BUFS: "queue.SimpleQueue[bytearray]" = queue.SimpleQueue()  # reused readinto buffers
+
+def _fastcopy(src, dst) -> str:
+    """
+    shutil.copy2 replacement for cross-device moves: the data is copied in
+    the kernel (copy_file_range, else sendfile), then metadata via copystat.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        sfd, dfd = fsrc.fileno(), fdst.fileno()
+        done = False
+        for kcopy in (getattr(os, "copy_file_range", None),
+                      lambda i, o, n: os.sendfile(o, i, None, n)):
+            if kcopy is None:
+                continue
+            try:
+                while kcopy(sfd, dfd, _COPY_CHUNK):
+                    pass
+                done = True
+                break
+            except OSError:
+                # unsupported here (old kernel, odd fs): restart the next way
+                os.lseek(sfd, 0, os.SEEK_SET)
+                os.lseek(dfd, 0, os.SEEK_SET)
+                os.ftruncate(dfd, 0)
+        if not done:
+            try:
+                buf = _COPY_BUFS.get_nowait()
+            except queue.Empty:
+                buf = bytearray(_COPY_CHUNK)
+            view = memoryview(buf)
+            while n := fsrc.readinto(buf):
+                fdst.write(view[:n])
+            view.release()
+            _COPY_BUFS.put(buf)
+    shutil.copystat(src, dst)
+    return dst
+
+def _plan_copy_into(src: Path, dest: Path, pairs: list) -> None:
+    """
+    _move_into's merge rules for a copy: directories and symlinks are made
+    now, regular files are queued on `pairs` for _copy_into.
+    """
+    if src.is_dir() and not src.is_symlink():
+        if dest.is_symlink() or (dest.exists() and not dest.is_dir()):
+            dest.unlink()
+        dest.mkdir(exist_ok=True)
+        with os.scandir(src) as it:
+            children = [e.name for e in it]
+        for name in children:
+            _plan_copy_into(src / name, dest / name, pairs)
+        return
+    if dest.is_dir() and not dest.is_symlink():
+        shutil.rmtree(dest)
+    if src.is_symlink():
+        if dest.is_symlink() or dest.exists():
+            dest.unlink()
+        os.symlink(os.readlink(src), dest)
+        return
+    pairs.append((src, dest))
+
+def _copy_into(items: list[Path], dest: Path, workers: int = 4) -> None:
+    """Copy `items` into `dest` (merging) with the file copies overlapped on a small pool."""
+    pairs: list[tuple[Path, Path]] = []
+    for item in items:
+        _plan_copy_into(item, dest / item.name, pairs)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="update-copy") as ex:
+        for fut in [ex.submit(_fastcopy, s, d) for s, d in pairs]:
+            fut.result()
+
+def _move_into(src: Path, dest: Path) -> None:
+    """
+    Move `src` onto `dest`, merging into existing directories. Renames instead
+    of copying; only a cross-device staging dir falls back to shutil.move.
+    Files already in `dest` that `src` lacks (uploads, instance data) are kept.
+    """
+    if src.is_dir() and not src.is_symlink() and dest.is_dir() and not dest.is_symlink():
+        with os.scandir(src) as it:
+            children = [e.name for e in it]
+        for name in children:
+            _move_into(src / name, dest / name)
+        return
+    if dest.is_dir() and not dest.is_symlink():
+        shutil.rmtree(dest)
+    try:
+        os.replace(src, dest)
+    except OSError:
+        shutil.move(str(src), str(dest), copy_function=_fastcopy)
+
 def _tarball_update(app) -> Tuple[bool, str]:
     import urllib.request
 
     root = _app_root(app)
 
-    with tempfile.TemporaryDirectory() as tmpd:
-        tar_path = Path(tmpd) / "repo.tar.gz"
+    # stage next to the app so the final moves are same-filesystem renames
+    try:
+        staging = tempfile.TemporaryDirectory(dir=str(root.parent), prefix=f".{root.name}-update-")
+    except OSError:
+        staging = tempfile.TemporaryDirectory()
+
+    with staging as tmpd:
+        # download -> gunzip -> extract in one pass, no repo.tar.gz on disk
         try:
-            with urllib.request.urlopen(TARBALL_URL, timeout=30) as r, open(tar_path, "wb") as f:
-                shutil.copyfileobj(r, f)
+            with urllib.request.urlopen(TARBALL_URL, timeout=30) as r:
+                _extract_tar_stream(r, Path(tmpd))
         except Exception as e:
-            return False, f"Download failed: {e}"
-
-        with tarfile.open(tar_path, "r:gz") as tar:
-            _safe_extract_all(tar, Path(tmpd))
+            return False, f"Download/extract failed: {e}"
 
         top_dirs = [p for p in Path(tmpd).iterdir() if p.is_dir()]
         if not top_dirs:
             return False, "Unexpected tarball layout"
         src = top_dirs[0]
 
-        for item in src.iterdir():
-            rel = item.name
-            if _tar_exclude(rel):
-                continue
-
-            dest = root / rel
-            if item.is_dir():
-                if dest.exists():
-                    for src_dirpath, _, files in os.walk(item):
-                        rel_dir = Path(src_dirpath).relative_to(item)
-                        dst_dir = dest / rel_dir
-                        dst_dir.mkdir(parents=True, exist_ok=True)
-                        for fn in files:
-                            s = Path(src_dirpath) / fn
-                            d = dst_dir / fn
-                            shutil.copy2(s, d)
-                else:
-                    shutil.copytree(item, dest)
-            else:
-                dest.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(item, dest)
+        items = [item for item in src.iterdir() if not _tar_exclude(item.name)]
+        if os.stat(tmpd).st_dev == os.stat(root).st_dev:
+            for item in items:
+                _move_into(item, root / item.name)
+        else:
+            # staging landed on another filesystem: renames would degrade to
+            # serial copies, so copy in parallel instead
+            _copy_into(items, root)
 
     return True, "Updated from tarball"
 
@@ -292,8 +674,7 @@ def get_current_log_for_download(app):
 def get_latest_support_bundle(app) -> Optional[Path]:
     sup = Path(app.instance_path) / "support"
     sup.mkdir(parents=True, exist_ok=True)
-    candidates = sorted(sup.glob("support_*.tar.gz"), key=lambda p: p.stat().st_mtime, reverse=True)
-    return candidates[0] if candidates else None
+    return _newest_file(sup, "support_", ".tar.gz")
 
 def save_snapshot_file(app, attempts: int = 5, sleep_ms: int = 300) -> Optional[Path]:
     """
@@ -362,7 +743,7 @@ def create_support_bundle(app, include_snapshot: bool = True) -> tuple[bool, Opt
         reqs = root / "requirements.txt"
 
         contents = []
-        with tarfile.open(bundle, "w:gz") as tar:
+        with _tar_gz_writer(bundle) as tar:
             if logs_dir.exists():
                 tar.add(str(logs_dir), arcname="logs")
                 contents.append("logs/*")
@@ -385,6 +766,40 @@ def create_support_bundle(app, include_snapshot: bool = True) -> tuple[bool, Opt
         app.logger.exception("[bundle] creation failed")
         return False, None, str(e)
 
+# One pooled HTTP session for remote uploads: repeat uploads reuse the
+# TCP/TLS connection instead of handshaking every time
+_HTTP_SESSION = None
+_http_lock = threading.Lock()
+
+def _http_session():
+    global _HTTP_SESSION
+    with _http_lock:
+        if _HTTP_SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            sess = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            sess.mount("https://", adapter)
+            sess.mount("http://", adapter)
+            _HTTP_SESSION = sess
+        return _HTTP_SESSION
+
+def _post_multipart(url: str, headers: dict, fh, filename: str, ctype: str,
+                    fields: Optional[dict] = None, timeout: int = 60):
+    """
+    POST `fh` as multipart field "file". With requests_toolbelt the body is
+    streamed from the file; plain requests builds it in memory.
+    """
+    sess = _http_session()
+    try:
+        from requests_toolbelt.multipart.encoder import MultipartEncoder
+    except ImportError:
+        return sess.post(url, headers=headers, files={"file": (filename, fh, ctype)},
+                         data=fields, timeout=timeout)
+    enc = MultipartEncoder(fields={**(fields or {}), "file": (filename, fh, ctype)})
+    return sess.post(url, headers={**headers, "Content-Type": enc.content_type},
+                     data=enc, timeout=timeout)
+
 def _upload_path_to_remote(app, path: Path, kind: str = "file") -> tuple[bool, str]:
     """
     Post multipart 'file' to FIREPI_UPLOAD_URL with optional bearer token.
@@ -420,9 +835,8 @@ def _upload_path_to_remote(app, path: Path, kind: str = "file") -> tuple[bool, s
 
     try:
         with open(path, "rb") as fh:
-            files = {"file": (path.name, fh, "application/octet-stream")}
-            data = {"kind": kind}
-            r = requests.post(url, headers=headers, files=files, data=data, timeout=60)
+            r = _post_multipart(url, headers, fh, path.name, "application/octet-stream",
+                                fields={"kind": kind}, timeout=60)
 
         snippet = (r.text or "")[:200]
         app.logger.info("[upload] remote responded %s: %s", r.status_code, snippet)
@@ -447,7 +861,7 @@ def upload_logs_to_remote(app) -> tuple[bool, str]:
         logs_dir = _log_dir(app)
         if not logs_dir.exists():
             return False, "No logs to upload"
-        with tarfile.open(tpath, "w:gz") as tar:
+        with _tar_gz_writer(tpath) as tar:
             tar.add(str(logs_dir), arcname="logs")
     except Exception as e:
         return False, f"Pack logs failed: {e}"
@@ -500,9 +914,9 @@ def upload_snapshot(app, url: str) -> tuple[bool, str]:
     except Exception:
         return False, "The 'requests' package is required for remote upload"
 
-    files = {"file": (p.name, open(p, "rb"), "image/jpeg")}
     try:
-        r = requests.post(url, headers=headers, files=files, timeout=45)
+        with open(p, "rb") as fh:
+            r = _post_multipart(url, headers, fh, p.name, "image/jpeg", timeout=45)
         if 200 <= r.status_code < 300:
             return True, "Uploaded"
         return False, f"Upload failed: {r.status_code} {r.text[:200]}"
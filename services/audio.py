@@ -1,4 +1,5 @@
 from __future__ import annotations
+import math
 import os
 import re
 import shutil
@@ -6,28 +7,68 @@ import subprocess as sp
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
+from functools import lru_cache
 from werkzeug.utils import secure_filename
-from flask import current_app, send_from_directory, url_for
+from flask import current_app, url_for
+from .file_send import send_from_directory_accel
+from .upload_io import save_file_storage
+
+# libasound bindings (pyalsaaudio): mixer reads/writes without forking amixer
+try:
+    import alsaaudio
+except ImportError:
+    alsaaudio = None
+
+# The UI's percent is amixer -M's mapped (perceptual) scale; pyalsaaudio's own
+# percent is raw-linear. Only use it for volume when it can report dB, so we
+# can map the same way amixer does (older bindings: amixer for get/set).
+_ALSA_DB = getattr(alsaaudio, "VOLUME_UNITS_DB", None) if alsaaudio is not None else None
+_DB_MUTE = -9999999           # SND_CTL_TLV_DB_GAIN_MUTE
+_MAX_LINEAR_DB_SCALE = 2400   # 24 dB, in ALSA's 0.01 dB units
 
 ALLOWED_EXTS = {".mp3", ".wav", ".m4a", ".ogg", ".flac", ".aac", ".oga"}
 
+# amixer binary and the first mixer control that answered; probing every
+# candidate forks amixer once per control, so do it once and reuse the winner
+_AMIXER: Optional[str] = None
+_WORKING_CTL: Optional[str] = None
+_PCT_RE = re.compile(r"\[(\d{1,3})%\]")
+_PCT_LOOSE_RE = re.compile(r"(\d{1,3})%")
+_CTL_NAME_RE = re.compile(r"'([^']+)'")
+_MIXERS: dict = {}  # control name -> alsaaudio.Mixer
+_STATIC_CTLS = ("FirePiVolume", "Master", "PCM", "Digital", "Speaker", "Headphone")
+_CANDIDATES: Optional[tuple[str, ...]] = None  # config/env overrides + _STATIC_CTLS
+
+@lru_cache(maxsize=1)
 def _project_root() -> Path:
     return Path(__file__).resolve().parents[1]
 
 
+# (app or None, is_stock_audio) -> resolved dir; AUDIO_DIR is fixed at startup
+_AUDIO_DIRS: dict[tuple[object, bool], str] = {}
+
 def get_audio_dir(is_stock_audio: bool = False) -> str:
     # Try Flask app context first
     try:
         app = current_app._get_current_object()  # raises outside of app context
+    except Exception:
+        app = None
+    key = (app, bool(is_stock_audio))
+    base = _AUDIO_DIRS.get(key)
+    if base is not None:
+        return base
+
+    if app is not None:
         base = app.config.get("AUDIO_DIR")
         if not base:
             base = os.path.join(app.root_path, "audio")
             if is_stock_audio:
                 base = os.path.join(base, "stock")
-    except Exception as e:
+    else:
         base = str((_project_root() / "audio").resolve())
         if is_stock_audio: base = base + '/stock'
 
+    _AUDIO_DIRS[key] = base
     return base
 
 
@@ -51,20 +92,18 @@ def is_allowed(filename: str) -> bool:
 
 
 def list_audio_files() -> list[dict]:
-    root = Path(get_audio_dir())
+    # scandir: the extension filter needs no syscall, is_file() usually uses d_type
+    with os.scandir(get_audio_dir()) as it:
+        entries = sorted((e for e in it if is_allowed(e.name) and e.is_file()), key=lambda e: e.name)
     out: list[dict] = []
-    for p in sorted(root.iterdir()):
-        if not p.is_file():
-            continue
-        if not is_allowed(p.name):
-            continue
-        stat = p.stat()
+    for e in entries:
+        stat = e.stat()
         mtime = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
         out.append({
-            "filename": p.name,
+            "filename": e.name,
             "size": stat.st_size,
             "mtime": mtime,
-            "url": url_for("config_ui.audio_file", filename=p.name),
+            "url": url_for("config_ui.audio_file", filename=e.name),
         })
     return out
 
@@ -95,7 +134,7 @@ def save_upload(file_storage) -> dict:
                 break
             n += 1
 
-    file_storage.save(str(dest))
+    save_file_storage(file_storage, dest)
     return {"filename": dest.name, "url": url_for("config_ui.audio_file", filename=dest.name)}
 
 
@@ -108,19 +147,27 @@ def ensure_exists(name: str) -> bool:
 
 def serve_file(filename: str):
     # Safe directory-bound send; filename must be the exact basename we stored
-    return send_from_directory(get_audio_dir(), filename, as_attachment=False)
+    return send_from_directory_accel(get_audio_dir(), filename, "audio", as_attachment=False)
 
 
 def _amixer_path() -> Optional[str]:
-    return shutil.which("amixer")
+    global _AMIXER
+    if _AMIXER is None:
+        _AMIXER = shutil.which("amixer")
+    return _AMIXER
 
 
-def _candidate_controls() -> list[str]:
+def _candidate_controls() -> tuple[str, ...]:
+    global _CANDIDATES
+    if _CANDIDATES is not None:
+        return _CANDIDATES
     names: list[str] = []
+    have_cfg = False
 
     # Try Flask config
     try:
         app = current_app._get_current_object()
+        have_cfg = True
         ctl = app.config.get("ALSA_CONTROL")
         if ctl:
             names.append(str(ctl))
@@ -132,79 +179,180 @@ def _candidate_controls() -> list[str]:
     if env_ctl:
         names.append(env_ctl)
 
-    names += ["FirePiVolume", "Master", "PCM", "Digital", "Speaker", "Headphone"]
-
-    # De-dupe preserving order
-    seen: set[str] = set()
-    out: list[str] = []
-    for n in names:
-        if n not in seen:
-            seen.add(n)
-            out.append(n)
+    # De-dupe preserving order; only cache once the app config has been seen
+    out = tuple(dict.fromkeys((*names, *_STATIC_CTLS)))
+    if have_cfg:
+        _CANDIDATES = out
     return out
 
 
+def invalidate_mixer_cache() -> None:
+    """Forget the probed control (e.g. after changing ALSA_CONTROL or the sound card)."""
+    global _CANDIDATES, _WORKING_CTL
+    _CANDIDATES = _WORKING_CTL = None
+    _MIXERS.clear()
+
+
 def _list_all_controls() -> list[str]:
     amixer = _amixer_path()
-    if not amixer:
+    if alsaaudio is not None:
+        try:
+            names = list(alsaaudio.mixers())
+        except Exception:
+            return []
+    elif not amixer:
         return []
+    else:
+        try:
+            txt = sp.check_output([amixer, "-M", "scontrols"], text=True, timeout=3)
+        except Exception:
+            return []
+        # Lines look like: "Simple mixer control 'Speaker',0"
+        names = _CTL_NAME_RE.findall(txt)
+    # De-dupe preserving order
+    return list(dict.fromkeys(names))
+
+
+def _controls_to_try():
+    # cached control first; the probe (and `scontrols`) only runs if it stops answering
+    cached = _WORKING_CTL
+    if cached:
+        yield cached
+    for ctl in _candidate_controls():
+        if ctl != cached:
+            yield ctl
+    for ctl in _list_all_controls():
+        if ctl != cached:
+            yield ctl
+
+
+def _alsa_mixer(ctl: str):
+    m = _MIXERS.get(ctl)
+    if m is None:
+        m = _MIXERS[ctl] = alsaaudio.Mixer(control=ctl)
+    elif hasattr(m, "handleevents"):
+        m.handleevents()  # pick up changes made by other clients
+    return m
+
+
+# Port of alsa-utils' volume_mapping.c (what `amixer -M` uses): linear in dB
+# for ranges up to 24 dB, otherwise 10^(dB/60) normalised to the control's
+# minimum. Controls without dB info are linear in raw units, which is what
+# pyalsaaudio's plain percent already is.
+def _db_to_mapped(db: int, lo: int, hi: int) -> float:
+    if hi - lo <= _MAX_LINEAR_DB_SCALE:
+        return (db - lo) / (hi - lo)
+    norm = 10 ** ((db - hi) / 6000.0)
+    if lo != _DB_MUTE:
+        min_norm = 10 ** ((lo - hi) / 6000.0)
+        norm = (norm - min_norm) / (1 - min_norm)
+    return norm
+
+
+def _mapped_to_db(frac: float, lo: int, hi: int) -> int:
+    if hi - lo <= _MAX_LINEAR_DB_SCALE:
+        return round(frac * (hi - lo)) + lo
+    if lo != _DB_MUTE:
+        min_norm = 10 ** ((lo - hi) / 6000.0)
+        frac = frac * (1 - min_norm) + min_norm
+    if frac <= 0:
+        return lo
+    return max(lo, round(6000 * math.log10(frac)) + hi)
+
+
+def _alsa_db_range(m) -> Optional[tuple[int, int]]:
     try:
-        txt = sp.check_output([amixer, "-M", "scontrols"], text=True, timeout=3)
+        lo, hi = m.getrange(units=_ALSA_DB)
     except Exception:
-        return []
-    # Lines look like: "Simple mixer control 'Speaker',0"
-    names = re.findall(r"'([^']+)'", txt)
-    # De-dupe preserving order
-    seen: set[str] = set()
-    out: list[str] = []
-    for n in names:
-        if n not in seen:
-            seen.add(n)
-            out.append(n)
-    return out
+        return None  # control has no dB scale
+    return (int(lo), int(hi)) if lo < hi else None
 
 
-def get_system_volume() -> Optional[int]:
-    amixer = _amixer_path()
-    if not amixer:
+def _read_volume(amixer: Optional[str], ctl: str) -> Optional[int]:
+    if _ALSA_DB is not None:
+        try:
+            m = _alsa_mixer(ctl)
+            rng = _alsa_db_range(m)
+            if rng is None:
+                vols = [int(v) for v in m.getvolume()]
+            else:
+                vols = [round(100 * _db_to_mapped(int(v), *rng)) for v in m.getvolume(units=_ALSA_DB)]
+        except Exception:
+            _MIXERS.pop(ctl, None)
+            return None
+        return max(0, min(100, max(vols))) if vols else None
+    try:
+        out = sp.check_output([amixer, "-M", "sget", ctl], stderr=sp.DEVNULL, text=True, timeout=3)
+    except Exception:
         return None
 
-    for ctl in [*_candidate_controls(), *_list_all_controls()]:
+    m = _PCT_RE.findall(out) or _PCT_LOOSE_RE.findall(out)
+    if m:
         try:
-            out = sp.check_output([amixer, "-M", "sget", ctl], stderr=sp.DEVNULL, text=True, timeout=3)
-        except Exception:
-            continue
+            vals = [max(0, min(100, int(x))) for x in m]
+            return max(vals)
+        except ValueError:
+            pass
+    return None
 
-        m = re.findall(r"\[(\d{1,3})%\]", out)
-        if not m:
-            m = re.findall(r"(\d{1,3})%", out)
 
-        if m:
-            try:
-                vals = [max(0, min(100, int(x))) for x in m]
-                return max(vals)
-            except ValueError:
-                pass
+def get_system_volume() -> Optional[int]:
+    global _WORKING_CTL
+    amixer = _amixer_path()
+    if not amixer and _ALSA_DB is None:
+        return None
+
+    for ctl in _controls_to_try():
+        vol = _read_volume(amixer, ctl)
+        if vol is not None:
+            _WORKING_CTL = ctl
+            return vol
+        if ctl == _WORKING_CTL:
+            _WORKING_CTL = None
 
     return None
 
 def set_system_volume(percent: int) -> None:
+    global _WORKING_CTL
     amixer = _amixer_path()
-    if not amixer:
+    if not amixer and _ALSA_DB is None:
         raise RuntimeError("amixer not found (install 'alsa-utils').")
 
     val = max(0, min(100, int(percent)))
     last_err: Optional[Exception] = None
     tried: list[str] = []
 
-    for ctl in [*_candidate_controls(), *_list_all_controls()]:
+    for ctl in _controls_to_try():
         tried.append(ctl)
+        if _ALSA_DB is not None:
+            try:
+                m = _alsa_mixer(ctl)
+                rng = _alsa_db_range(m)
+                if rng is None:
+                    m.setvolume(val)
+                else:
+                    m.setvolume(_mapped_to_db(val / 100.0, *rng), units=_ALSA_DB)
+                try:
+                    m.setmute(0)
+                except Exception:
+                    pass  # control has no mute switch
+                _WORKING_CTL = ctl
+                return
+            except Exception as e:
+                last_err = e
+                _MIXERS.pop(ctl, None)
+                if ctl == _WORKING_CTL:
+                    _WORKING_CTL = None
+                continue
         try:
             sp.run([amixer, "-M", "sset", ctl, f"{val}%", "unmute"],
                    check=True, stdout=sp.DEVNULL, stderr=sp.DEVNULL, timeout=3)
+            _WORKING_CTL = ctl
             return
         except Exception as e:
             last_err = e
+            if ctl == _WORKING_CTL:
+                _WORKING_CTL = None
             continue
 
     raise RuntimeError(
@@ -222,7 +370,7 @@ def delete_audio(filename: str) -> tuple[bool, str | None]:
         p: Path = resolve_audio_path(fn)
         # Double-check we're within the audio dir
         audio_dir = Path(current_app.instance_path) / "audio"
-        if not str(p.resolve()).startswith(str(audio_dir.resolve())):
+        if not p.resolve().is_relative_to(audio_dir.resolve()):
             return False, "Refusing to delete outside audio dir"
 
         if not p.exists() or not p.is_file():
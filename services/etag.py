@@ -0,0 +1,43 @@
+# services/etag.py
+from __future__ import annotations
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+# Per-process change counters for data without a cheap "last modified" column.
+# The boot token keeps tags from colliding across restarts.
+_BOOT = f"{time.time_ns():x}"
+_versions: dict[str, int] = {}
+_lock = threading.Lock()
+
+def bump_version(name: str) -> None:
+    with _lock:
+        _versions[name] = _versions.get(name, 0) + 1
+
+def data_version(name: str) -> str:
+    return f"{_BOOT}-{_versions.get(name, 0)}"
+
+def etag(signature):
+    """
+    Decorate a GET view with a weak ETag computed by `signature()` (a str, or
+    None to skip). A matching If-None-Match gets a 304 without running the view.
+    """
+    def deco(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            sig = signature()
+            if sig is None:
+                return view(*args, **kwargs)
+            if request.if_none_match.contains_weak(sig):
+                resp = current_app.response_class(status=304)
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(sig, weak=True)
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        return wrapper
+    return deco
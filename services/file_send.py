@@ -0,0 +1,35 @@
+# services/file_send.py
+from __future__ import annotations
+import mimetypes
+from pathlib import Path
+from urllib.parse import quote
+
+from flask import abort, current_app, send_from_directory
+from werkzeug.security import safe_join
+
+
+def send_from_directory_accel(directory, filename: str, location: str, **kwargs):
+    """
+    send_from_directory() that hands the transfer to a front-end proxy.
+
+    - X_ACCEL_PREFIX set (nginx): empty response with
+      X-Accel-Redirect: <prefix>/<location>/<filename>; nginx needs a matching
+      `internal` location aliased to `directory`.
+    - USE_X_SENDFILE set (Apache/lighttpd): Flask's own X-Sendfile support.
+    - Neither: Flask streams the file itself.
+    """
+    prefix = current_app.config.get("X_ACCEL_PREFIX")
+    if not prefix:
+        return send_from_directory(directory, filename, **kwargs)
+
+    path = safe_join(str(directory), filename)
+    if path is None or not Path(path).is_file():
+        abort(404)
+
+    resp = current_app.response_class()
+    resp.headers["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{location}/{quote(filename)}"
+    resp.headers["Content-Type"] = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if kwargs.get("as_attachment"):
+        name = kwargs.get("download_name") or Path(filename).name
+        resp.headers.set("Content-Disposition", "attachment", filename=name)
+    return resp
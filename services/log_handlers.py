@@ -0,0 +1,117 @@
+# services/log_handlers.py
+from __future__ import annotations
+import logging
+import threading
+import time
+from logging.handlers import TimedRotatingFileHandler
+
+
+class BufferedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    TimedRotatingFileHandler that keeps records in a 64 KiB write buffer.
+    - Flushes immediately for ERROR and above.
+    - Otherwise flushes when the buffer fills, or every `flush_interval` seconds
+      (background thread), so a chatty INFO log costs one write() per batch.
+    - Re-checks the log file for rollover at most once per second.
+    """
+
+    def __init__(self, *args, buffer_size: int = 64 * 1024, flush_interval: float = 30.0, **kwargs):
+        self.buffer_size = int(buffer_size)
+        self.flush_interval = float(flush_interval)
+        self._last_flush = time.monotonic()
+        self._deferring = False
+        self._last_rollover_check = 0.0
+        super().__init__(*args, **kwargs)
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="log-flush", daemon=True)
+        self._flusher.start()
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def shouldRollover(self, record):
+        # the base check stat()s the log file on every record; a "no" stays
+        # valid until rolloverAt, so only repeat it once per second
+        now = time.time()
+        if now < self.rolloverAt and (now - self._last_rollover_check) < 1.0:
+            return False
+        self._last_rollover_check = now
+        return super().shouldRollover(record)
+
+    def emit(self, record):
+        # StreamHandler.emit() calls flush() after every record; skip that unless
+        # the record is an error or the buffer is getting stale.
+        self._deferring = (
+            record.levelno < logging.ERROR
+            and (time.monotonic() - self._last_flush) < self.flush_interval
+        )
+        try:
+            super().emit(record)
+        finally:
+            self._deferring = False
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._deferring:
+                return
+            super().flush()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self):
+        self._closed.set()
+        super().close()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+
+class SingleWriteStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler that hands message + terminator to the stream in one write()
+    (older CPython wrote them separately), then flushes once.
+    """
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            self.acquire()
+            try:
+                self.stream.write(msg)
+                self.stream.flush()
+            finally:
+                self.release()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """
+    Formatter that reuses the %(asctime)s string for records in the same
+    wall-clock second. Only valid for a datefmt without sub-second fields.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached: tuple[int, str] = (-1, "")
+
+    def formatTime(self, record, datefmt=None):
+        if not datefmt:
+            return super().formatTime(record, datefmt)
+        sec = int(record.created)
+        cached_sec, cached_str = self._cached
+        if sec == cached_sec:
+            return cached_str
+        s = time.strftime(datefmt, self.converter(record.created))
+        self._cached = (sec, s)
+        return s
@@ -2,20 +2,34 @@
 from __future__ import annotations
 import json
 import logging
+import queue
 import threading
 import time
 from typing import Any, Dict, Optional, Tuple
 
 import paho.mqtt.client as mqtt
 
+# orjson (C) encodes straight to bytes, which paho sends as-is
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 _LOG = logging.getLogger(__name__)
 
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
 class MqttPublisher:
     """
     Self-contained persistent MQTT client.
     - Connects synchronously in connect().
     - Runs network loop in background (auto-reconnects).
     - Simple publish helpers (text/json).
+    - publish_async() queues messages; a flusher thread sends each burst
+      back-to-back so paho can coalesce them into fewer socket writes.
     """
 
     def __init__(
@@ -30,6 +44,8 @@ class MqttPublisher:
         tls: Optional[Dict[str, Any]] = None,
         will: Optional[Tuple[str, str, int, bool]] = None,  # (topic, payload, qos, retain)
         logger: Optional[logging.Logger] = None,
+        batch_ms: int = 20,
+        max_batch: int = 64,
     ):
         self.host = host
         self.port = int(port or 1883)
@@ -40,10 +56,15 @@ class MqttPublisher:
         self.tls = tls or {}
         self.will = will
         self.log = logger or _LOG
+        self.status_topic: Optional[str] = None
+        self.batch_s = max(0, int(batch_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
 
         self._client = mqtt.Client(client_id=self.client_id, clean_session=True)
         self._connected = threading.Event()
         self._stop = threading.Event()
+        self._tx_q: "queue.SimpleQueue[Tuple[str, Any, int, bool]]" = queue.SimpleQueue()
+        self._flusher: Optional[threading.Thread] = None
 
         # Callbacks
         self._client.on_connect = self._on_connect
@@ -100,9 +121,16 @@ class MqttPublisher:
             self._client.loop_stop()
             raise RuntimeError("MQTT connect timeout")
 
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name="mqtt-flusher", daemon=True)
+            self._flusher.start()
+
     def close(self) -> None:
         try:
             self._stop.set()
+            if self._flusher is not None:
+                self._flusher.join(timeout=1.0)
+                self._flusher = None
             self._client.disconnect()
         except Exception:
             pass
@@ -125,10 +153,101 @@ class MqttPublisher:
         return res
 
     def publish_json(self, topic: str, data: Dict[str, Any], qos: int = 0, retain: bool = False):
-        return self.publish(topic, json.dumps(data), qos=qos, retain=retain)
+        return self.publish(topic, _dumps(data), qos=qos, retain=retain)
+
+    def publish_async(self, topic: str, payload: str | bytes, qos: int = 0, retain: bool = False) -> None:
+        """Queue a publish for the flusher thread; never blocks the caller."""
+        self._tx_q.put((topic, payload, qos, retain))
+
+    def publish_json_async(self, topic: str, data: Dict[str, Any], qos: int = 0, retain: bool = False) -> None:
+        self.publish_async(topic, _dumps(data), qos=qos, retain=retain)
+
+    def _flush_loop(self) -> None:
+        q = self._tx_q
+        while True:
+            try:
+                item = q.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            # Let the rest of the burst arrive, then send it back-to-back
+            if self.batch_s:
+                time.sleep(self.batch_s)
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            for topic, payload, qos, retain in batch:
+                try:
+                    res = self._client.publish(topic, payload=payload, qos=qos, retain=retain)
+                    if res.rc not in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN):
+                        self.log.warning("[MQTT] publish rc=%s topic=%s", res.rc, topic)
+                except Exception:
+                    self.log.exception("[MQTT] queued publish failed topic=%s", topic)
+
+class MqttPublisherPool:
+    """
+    N persistent MqttPublishers behind the MqttPublisher publish API.
+    Each topic is pinned to one connection (hash & mask, no lock), so
+    different topics fan out over parallel sockets while messages on
+    the same topic keep their order. Only member 0 carries the LWT, so the
+    will topic and every retained (status) publish also go through member 0:
+    "online" and the broker's "offline" then track the same socket.
+    """
+
+    def __init__(self, *, size: int = 4, client_id: str = "firepi", will=None, **kwargs):
+        size = max(1, int(size))
+        n = 1 << (size - 1).bit_length()  # round up to a power of two
+        self._mask = n - 1
+        self._pubs = tuple(
+            MqttPublisher(client_id=f"{client_id}-{i}", will=will if i == 0 else None, **kwargs)
+            for i in range(n)
+        )
+        self._will_topic = will[0] if will else None
+        self.status_topic: Optional[str] = None
+        self.log = self._pubs[0].log
+
+    def _pick(self, topic: str, retain: bool = False) -> MqttPublisher:
+        if retain or topic == self._will_topic:
+            return self._pubs[0]
+        return self._pubs[hash(topic) & self._mask]
+
+    def connect(self, *, timeout_s: int = 10) -> None:
+        try:
+            for p in self._pubs:
+                p.connect(timeout_s=timeout_s)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        for p in self._pubs:
+            p.close()
+
+    def publish(self, topic: str, payload: str | bytes, qos: int = 0, retain: bool = False):
+        return self._pick(topic, retain).publish(topic, payload, qos=qos, retain=retain)
+
+    def publish_json(self, topic: str, data: Dict[str, Any], qos: int = 0, retain: bool = False):
+        return self._pick(topic, retain).publish_json(topic, data, qos=qos, retain=retain)
+
+    def publish_async(self, topic: str, payload: str | bytes, qos: int = 0, retain: bool = False) -> None:
+        self._pick(topic, retain).publish_async(topic, payload, qos=qos, retain=retain)
+
+    def publish_json_async(self, topic: str, data: Dict[str, Any], qos: int = 0, retain: bool = False) -> None:
+        self._pick(topic, retain).publish_json_async(topic, data, qos=qos, retain=retain)
 
 # --------- App-level helpers ---------
 
+# Pre-encoded app status payloads (retained on <base>/service/status)
+_APP_OFFLINE_B = b'{"service":"app","status":"offline"}'
+_APP_ONLINE_HEAD_B = b'{"service":"app","status":"online","ts":'
+
+def _app_online_payload() -> bytes:
+    return b"".join((_APP_ONLINE_HEAD_B, str(int(time.time())).encode(), b"}"))
+
 def _parse_host_port(host: str) -> Tuple[str, int]:
     host = (host or "").strip()
     if ":" in host:
@@ -139,11 +258,17 @@ def _parse_host_port(host: str) -> Tuple[str, int]:
             return h.strip(), 1883
     return host, 1883
 
-def init_global_publisher(app, cfg: Dict[str, Any], *, client_id: str = "firepi-app", timeout_s: int = 10) -> MqttPublisher:
+def init_global_publisher(app, cfg: Dict[str, Any], *, client_id: str = "firepi-app", timeout_s: int = 10) -> "MqttPublisher | MqttPublisherPool":
     """
     Create+connect a single global publisher and store it under app.extensions['mqtt_publisher'].
+    With cfg["pool_size"] > 1 this is an MqttPublisherPool instead.
+    Returns the existing publisher if one is already registered.
     Raises RuntimeError on failure (so the app/monitors won't start).
     """
+    existing = app.extensions.get("mqtt_publisher")
+    if existing is not None:
+        return existing
+
     if not cfg:
         raise RuntimeError("MQTT config missing")
 
@@ -159,20 +284,27 @@ def init_global_publisher(app, cfg: Dict[str, Any], *, client_id: str = "firepi-
     # Optional retained service status topic (shared pattern)
     status_topic = f"{topic_base.rstrip('/')}/service/status"
 
-    pub = MqttPublisher(
+    try:
+        pool_size = int(cfg.get("pool_size") or 1)
+    except (TypeError, ValueError):
+        pool_size = 1
+
+    kwargs = dict(
         host=host,
         port=port,
         username=username,
         password=password,
         client_id=client_id,
-        will=(status_topic, '{"service":"app","status":"offline"}', 0, True),
+        will=(status_topic, _APP_OFFLINE_B, 0, True),
         logger=app.logger if hasattr(app, "logger") else None,
     )
+    pub = MqttPublisherPool(size=pool_size, **kwargs) if pool_size > 1 else MqttPublisher(**kwargs)
+    pub.status_topic = status_topic
     pub.connect(timeout_s=timeout_s)
 
     # On successful connect, publish "online" app status (retained)
     try:
-        pub.publish_json(status_topic, {"service": "app", "status": "online", "ts": int(time.time())}, qos=0, retain=True)
+        pub.publish(status_topic, _app_online_payload(), qos=0, retain=True)
     except Exception:
         app.logger.exception("Failed to publish initial app status")
 
@@ -181,7 +313,7 @@ def init_global_publisher(app, cfg: Dict[str, Any], *, client_id: str = "firepi-
     app.logger.info("MQTT initialized (host=%s:%s, base=%s)", host, port, app.config["MQTT_TOPIC_BASE"])
     return pub
 
-def get_publisher(app) -> MqttPublisher:
+def get_publisher(app) -> "MqttPublisher | MqttPublisherPool":
     pub = app.extensions.get("mqtt_publisher")
     if not pub:
         raise RuntimeError("Global MQTT publisher not initialized")
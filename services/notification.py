@@ -6,16 +6,53 @@ import os
 import subprocess as sp
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from email.utils import parseaddr, formataddr, format_datetime
 from email.mime.text import MIMEText
 from html import escape
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
 
 from services.audio import resolve_audio_path
 
+# Telephony SDKs are optional; import once so alerts don't pay for it per call
+try:
+    from twilio.rest import Client as _TwilioClient
+    from twilio.base.exceptions import TwilioRestException as _TwilioRestException
+    _TWILIO_ERR = None
+except Exception as e:
+    _TwilioClient = _TwilioRestException = None
+    _TWILIO_ERR = str(e)
+
+try:
+    import clicksend_client
+    from clicksend_client import (
+        SmsApi, SmsMessage, SmsMessageCollection,
+        VoiceApi, VoiceMessage, VoiceMessageCollection,
+    )
+    from clicksend_client.rest import ApiException as _ClickSendApiException
+    _CLICKSEND_ERR = None
+except Exception as e:
+    clicksend_client = None
+    _CLICKSEND_ERR = str(e)
+
 # Single shared lock so overlapping playbacks don't fight
 _SPEAKER_LOCK = threading.Lock()
 
+# One long-lived playback thread instead of a new thread per event
+_AUDIO_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-play")
+
+# Player binaries resolved once at import rather than per playback
+_APLAY  = shutil.which("aplay")  or "/usr/bin/aplay"
+_MPG123 = shutil.which("mpg123") or "/usr/bin/mpg123"
+_SOX    = shutil.which("sox")    or "/usr/bin/sox"
+_HAS_APLAY  = os.access(_APLAY, os.X_OK)
+_HAS_MPG123 = os.access(_MPG123, os.X_OK)
+_HAS_SOX    = os.access(_SOX, os.X_OK)
+
+# Player environment: keep it pure-ALSA (built once; Popen only reads it)
+_AUDIO_ENV = {k: v for k, v in os.environ.items() if k not in ("PULSE_SERVER", "XDG_RUNTIME_DIR")}
+
 
 # ---------- Helpers ----------
 def _valid_email(addr: str) -> bool:
@@ -23,17 +60,23 @@ def _valid_email(addr: str) -> bool:
     return bool(email and "@" in email and "." in email.split("@")[-1])
 
 
-def _alsa_device_exists(name: str) -> bool:
+@lru_cache(maxsize=1)
+def _alsa_devices() -> frozenset[str]:
     """
-    Return True if an ALSA PCM with this name exists (per `aplay -L`).
+    ALSA PCM names per `aplay -L`; probed once (call cache_clear() to re-probe).
     """
     try:
-        aplay = shutil.which("aplay") or "/usr/bin/aplay"
-        out = sp.check_output([aplay, "-L"], text=True, stderr=sp.DEVNULL)
-        ids = [ln.split(":")[0].strip() for ln in out.splitlines() if ln and not ln.startswith(" ")]
-        return name in ids
+        out = sp.check_output([_APLAY, "-L"], text=True, stderr=sp.DEVNULL)
+        return frozenset(ln.split(":")[0].strip() for ln in out.splitlines() if ln and not ln.startswith(" "))
     except Exception:
-        return False
+        return frozenset()
+
+
+def _alsa_device_exists(name: str) -> bool:
+    """
+    Return True if an ALSA PCM with this name exists (per `aplay -L`).
+    """
+    return name in _alsa_devices()
 
 
 def play_audio_pwm_async(audio_path: str, is_stock_audio: bool = False, logger=None, device_name: str | None = None) -> None:
@@ -43,11 +86,12 @@ def play_audio_pwm_async(audio_path: str, is_stock_audio: bool = False, logger=N
     """
     log = logger or logging.getLogger("firepi.audio")
 
+    # Don't trample (or queue behind) another playback; the worker releases
+    if not _SPEAKER_LOCK.acquire(blocking=False):
+        log.info("Speaker busy; skipping playback")
+        return
+
     def _worker():
-        # Don't trample another playback
-        if not _SPEAKER_LOCK.acquire(blocking=False):
-            log.info("Speaker busy; skipping playback")
-            return
         try:
             p: Path | None = resolve_audio_path(audio_path, is_stock_audio=is_stock_audio)
             if not p:
@@ -57,43 +101,34 @@ def play_audio_pwm_async(audio_path: str, is_stock_audio: bool = False, logger=N
                     log.info("Audio file not found: %s", audio_path)
                 return
 
-            env = os.environ.copy()
-            # keep it pure-ALSA
-            env.pop("PULSE_SERVER", None)
-            env.pop("XDG_RUNTIME_DIR", None)
-
-            aplay  = shutil.which("aplay")  or "/usr/bin/aplay"
-            mpg123 = shutil.which("mpg123") or "/usr/bin/mpg123"
-            sox    = shutil.which("sox")    or "/usr/bin/sox"
-
             # Prefer sox pipeline (adds tiny fade, handles wav/mp3/ogg/…)
-            if os.access(sox, os.X_OK) and os.access(aplay, os.X_OK):
+            if _HAS_SOX and _HAS_APLAY:
                 # sox -> wav to stdout with 20ms fade-in/out + headroom
                 p1 = sp.Popen(
-                    [sox, str(p), "-t", "wav", "-", "gain", "-h", "fade", "t", "0.02", "-0", "0.02"],
-                    stdout=sp.PIPE, stderr=sp.DEVNULL, env=env
+                    [_SOX, str(p), "-t", "wav", "-", "gain", "-h", "fade", "t", "0.02", "-0", "0.02"],
+                    stdout=sp.PIPE, stderr=sp.DEVNULL, env=_AUDIO_ENV
                 )
-                args = [aplay, "-q"]
+                args = [_APLAY, "-q"]
                 if device_name: args += ["-D", device_name]
-                sp.Popen(args + ["-"], stdin=p1.stdout, stdout=sp.DEVNULL, stderr=sp.DEVNULL, env=env)
+                sp.Popen(args + ["-"], stdin=p1.stdout, stdout=sp.DEVNULL, stderr=sp.DEVNULL, env=_AUDIO_ENV)
                 if p1.stdout: p1.stdout.close()
                 return
 
             # Fallback: native players (no fade)
-            use_aplay = Path(p).suffix.lower() == ".wav" and os.access(aplay, os.X_OK)
+            use_aplay = Path(p).suffix.lower() == ".wav" and _HAS_APLAY
             if use_aplay:
-                args = [aplay, "-q"]
+                args = [_APLAY, "-q"]
                 if device_name: args += ["-D", device_name]
             else:
                 # For mp3, skip first frame to avoid header tick if mpg123 used
-                args = [mpg123, "-q", "-k", "1"] if os.access(mpg123, os.X_OK) else [aplay, "-q"]
+                args = [_MPG123, "-q", "-k", "1"] if _HAS_MPG123 else [_APLAY, "-q"]
                 if device_name and args[0].endswith("mpg123"):
                     args += ["-a", device_name]
             args.append(str(p))
 
             # Capture stderr so we see ALSA errors if nothing plays
-            log.info(f"Executing {args}")
-            proc = sp.Popen(args, env=env, stdout=sp.PIPE, stderr=sp.PIPE, text=True)
+            log.info("Executing %s", args)
+            proc = sp.Popen(args, env=_AUDIO_ENV, stdout=sp.PIPE, stderr=sp.PIPE, text=True)
             out, err = proc.communicate(timeout=180)
             if proc.returncode != 0:
                 log.info("Audio player rc=%s args=%s stderr=%s", proc.returncode, args, (err or "").strip())
@@ -104,13 +139,17 @@ def play_audio_pwm_async(audio_path: str, is_stock_audio: bool = False, logger=N
         finally:
             _SPEAKER_LOCK.release()
 
-    threading.Thread(target=_worker, name="audio-play", daemon=True).start()
+    try:
+        _AUDIO_EXECUTOR.submit(_worker)
+    except RuntimeError:
+        # Executor already shut down (interpreter exit)
+        _SPEAKER_LOCK.release()
 
 
 # ---------- Email ----------
 def send_email(config: dict, recipients: list[dict]) -> dict:
     """
-    SMTP email fan-out (sequential). config keys:
+    SMTP email fan-out (one transaction for all recipients). config keys:
       - server, port, username, password, notify_text
     recipients: list of {email, ...}
     """
@@ -154,17 +193,28 @@ def send_email(config: dict, recipients: list[dict]) -> dict:
         from_hdr = formataddr(("Ervin Glassworks", user))
         subj = subject.strip()
 
-        for rcpt in dest:
-            msg = MIMEText(f"{date_hdr}\n\n{body}", _charset="utf-8")
-            msg["Subject"] = subj
-            msg["From"] = from_hdr
-            msg["To"] = rcpt
-            msg["Date"] = date_hdr
-            try:
-                server.sendmail(user, [rcpt], msg.as_string())
-                results["sent"].append(rcpt)
-            except Exception as e:
+        # Same body for everyone: one envelope with all recipients (BCC-style,
+        # so addresses aren't disclosed) instead of a DATA round-trip each
+        msg = MIMEText(f"{date_hdr}\n\n{body}", _charset="utf-8")
+        msg["Subject"] = subj
+        msg["From"] = from_hdr
+        msg["To"] = "undisclosed-recipients:;"
+        msg["Date"] = date_hdr
+        try:
+            refused = server.sendmail(user, dest, msg.as_string())
+        except smtplib.SMTPRecipientsRefused as e:
+            refused = e.recipients
+        except Exception as e:
+            for rcpt in dest:
                 results["failed"][rcpt] = str(e)
+            refused = None
+        if refused is not None:
+            for rcpt in dest:
+                if rcpt in refused:
+                    code, resp = refused[rcpt]
+                    results["failed"][rcpt] = f"{code} {resp.decode(errors='replace') if isinstance(resp, bytes) else resp}"
+                else:
+                    results["sent"].append(rcpt)
     finally:
         try:
             if server:
@@ -190,12 +240,28 @@ def _build_numbers_for_sms(recipients: list[dict]) -> list[str]:
 
 
 # --- Twilio ---
+# Each create() is its own HTTPS round-trip; overlap them (results stay in order)
+_TWILIO_WORKERS = 8
+
+
+def _twilio_fanout(send, numbers: list[str]) -> list[dict]:
+    def _one(to: str) -> dict:
+        try:
+            return send(to)
+        except _TwilioRestException as e:
+            return {"to": to, "error": str(e), "status": getattr(e, "status", None), "code": getattr(e, "code", None)}
+        except Exception as e:
+            return {"to": to, "error": str(e)}
+
+    if len(numbers) <= 1:
+        return [_one(to) for to in numbers]
+    with ThreadPoolExecutor(max_workers=min(_TWILIO_WORKERS, len(numbers)), thread_name_prefix="twilio") as ex:
+        return list(ex.map(_one, numbers))
+
+
 def twilio_broadcast_calls(config: dict, numbers: list[str], *, message: str) -> dict:
-    try:
-        from twilio.rest import Client as TwilioClient
-        from twilio.base.exceptions import TwilioRestException
-    except Exception as e:
-        return {"error": f"twilio library not installed: {e}"}
+    if _TwilioClient is None:
+        return {"error": f"twilio library not installed: {_TWILIO_ERR}"}
 
     acc_sid = (config.get("username") or "").strip()
     api_key = (config.get("token") or "").strip()
@@ -204,27 +270,20 @@ def twilio_broadcast_calls(config: dict, numbers: list[str], *, message: str) ->
     if not (acc_sid and api_key and api_sec and from_num):
         return {"error": "Twilio credentials or from number missing"}
 
-    client = TwilioClient(api_key, api_sec, acc_sid)
+    client = _TwilioClient(api_key, api_sec, acc_sid)
     twiml = f"<Response><Say voice='alice' language='en-US'>{escape(message)}</Say></Response>"
 
-    out = []
-    for to in numbers:
-        try:
-            call = client.calls.create(to=to, from_=from_num, twiml=twiml, machine_detection="Enable")
-            out.append({"to": to, "call_sid": call.sid})
-        except TwilioRestException as e:
-            out.append({"to": to, "error": str(e), "status": getattr(e, "status", None), "code": getattr(e, "code", None)})
-        except Exception as e:
-            out.append({"to": to, "error": str(e)})
+    def _call(to: str) -> dict:
+        call = client.calls.create(to=to, from_=from_num, twiml=twiml, machine_detection="Enable")
+        return {"to": to, "call_sid": call.sid}
+
+    out = _twilio_fanout(_call, numbers)
     return {"provider": "twilio", "result": out}
 
 
 def twilio_broadcast_sms(config: dict, numbers: list[str], *, body: str) -> dict:
-    try:
-        from twilio.rest import Client as TwilioClient
-        from twilio.base.exceptions import TwilioRestException
-    except Exception as e:
-        return {"error": f"twilio library not installed: {e}"}
+    if _TwilioClient is None:
+        return {"error": f"twilio library not installed: {_TWILIO_ERR}"}
 
     acc_sid = (config.get("username") or "").strip()
     api_key = (config.get("token") or "").strip()
@@ -233,27 +292,20 @@ def twilio_broadcast_sms(config: dict, numbers: list[str], *, body: str) -> dict
     if not (acc_sid and api_key and api_sec and from_num):
         return {"error": "Twilio credentials or from number missing"}
 
-    client = TwilioClient(api_key, api_sec, acc_sid)
-    out = []
-    for to in numbers:
-        try:
-            msg = client.messages.create(to=to, from_=from_num, body=body)
-            out.append({"to": to, "sid": msg.sid})
-        except TwilioRestException as e:
-            out.append({"to": to, "error": str(e), "status": getattr(e, "status", None), "code": getattr(e, "code", None)})
-        except Exception as e:
-            out.append({"to": to, "error": str(e)})
+    client = _TwilioClient(api_key, api_sec, acc_sid)
+
+    def _sms(to: str) -> dict:
+        msg = client.messages.create(to=to, from_=from_num, body=body)
+        return {"to": to, "sid": msg.sid}
+
+    out = _twilio_fanout(_sms, numbers)
     return {"provider": "twilio", "result": out}
 
 
 # --- ClickSend ---
 def clicksend_send_sms(config: dict, recipients: list[dict]) -> dict:
-    try:
-        import clicksend_client
-        from clicksend_client import SmsMessage, SmsMessageCollection, SmsApi
-        from clicksend_client.rest import ApiException
-    except Exception as e:
-        return {"error": f"clicksend_client not installed: {e}"}
+    if clicksend_client is None:
+        return {"error": f"clicksend_client not installed: {_CLICKSEND_ERR}"}
 
     username = (config.get("username") or "").strip()
     api_key  = (config.get("api_key") or "").strip()
@@ -273,19 +325,15 @@ def clicksend_send_sms(config: dict, recipients: list[dict]) -> dict:
     try:
         resp = api.sms_send_post(SmsMessageCollection(messages=messages))
         return {"provider": "clicksend", "result": resp.to_dict() if hasattr(resp, "to_dict") else str(resp)}
-    except ApiException as e:
+    except _ClickSendApiException as e:
         return {"provider": "clicksend", "error": str(e)}
     except Exception as e:
         return {"provider": "clicksend", "error": str(e)}
 
 
 def clicksend_call_out(config: dict, recipients: list[dict]) -> dict:
-    try:
-        import clicksend_client
-        from clicksend_client import VoiceApi, VoiceMessage, VoiceMessageCollection
-        from clicksend_client.rest import ApiException
-    except Exception as e:
-        return {"error": f"clicksend_client not installed: {e}"}
+    if clicksend_client is None:
+        return {"error": f"clicksend_client not installed: {_CLICKSEND_ERR}"}
 
     username = (config.get("username") or "").strip()
     api_key  = (config.get("api_key")  or "").strip()
@@ -305,7 +353,7 @@ def clicksend_call_out(config: dict, recipients: list[dict]) -> dict:
     try:
         resp = api.voice_send_post(VoiceMessageCollection(messages=messages))
         return {"provider": "clicksend", "result": resp.to_dict() if hasattr(resp, "to_dict") else str(resp)}
-    except ApiException as e:
+    except _ClickSendApiException as e:
         return {"provider": "clicksend", "error": str(e)}
     except Exception as e:
         return {"provider": "clicksend", "error": str(e)}
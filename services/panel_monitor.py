@@ -2,6 +2,7 @@ from __future__ import annotations
 import os, time, threading, yaml, cv2
 import numpy as np
 from typing import Optional, Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from .mqtt_pub import get_publisher
 from services.seg7 import read_lcd_roi
 
@@ -170,6 +171,7 @@ class PanelMonitor:
 
         # MQTT persistent publisher + topics
         self._pub = None
+        self._mqtt_wanted = False
         self._topic_status = None
         self._topic_led_evt = None
         self._topic_lcd_evt = None
@@ -200,12 +202,8 @@ class PanelMonitor:
             self._thread.join(timeout=3)
         self.started = False
 
-        if self._pub:
-            try:
-                self._pub.close()
-            except Exception:
-                pass
-            self._pub = None
+        # The publisher is shared app-wide; just drop our reference
+        self._pub = None
 
         self.app.logger.info("PanelMonitor stopped.")
 
@@ -302,16 +300,27 @@ class PanelMonitor:
     def _init_mqtt_publisher(self):
         mqc = self.mqtt_cfg or {}
         host = (mqc.get("host") or "").strip()
-        base = (mqc.get("topic_base") or "").strip().rstrip("/")
+        base = (self.app.config.get("MQTT_TOPIC_BASE") or mqc.get("topic_base") or "").strip().rstrip("/")
         if host and base:
-            self._pub = get_publisher(mqc, client_id="firepi-panel")
+            self._mqtt_wanted = True
             self._topic_status  = f"{base}/panel/status"
             self._topic_led_evt = f"{base}/panel/events/alert_state_change"
             self._topic_lcd_evt = f"{base}/panel/events/lcd_state_change"
-            self.app.logger.info("PanelMonitor: MQTT ready (host=%s, base=%s)", host, base)
+            if self._attach_publisher():
+                self.app.logger.info("PanelMonitor: MQTT ready (host=%s, base=%s)", host, base)
         else:
             self.app.logger.info("PanelMonitor: MQTT not enabled")
 
+    def _attach_publisher(self) -> bool:
+        """Reuse the app's persistent publisher (MQTT init runs in the background)."""
+        if self._pub is not None:
+            return True
+        try:
+            self._pub = get_publisher(self.app)
+        except Exception:
+            return False
+        return True
+
     # ---------- worker ----------
     def _run(self):
         # Lower CPU priority a touch (best-effort)
@@ -328,6 +337,11 @@ class PanelMonitor:
         snap_interval = 1.0 / max(1, int(self.snapshot_hz))
         JPEG_QUALITY = 70
 
+        # LCD ROIs are independent and OpenCV drops the GIL, so on multi-core
+        # boards decode them side by side (OpenCV itself stays single-threaded)
+        lcd_workers = min(4, os.cpu_count() or 1)
+        lcd_pool = ThreadPoolExecutor(max_workers=lcd_workers, thread_name_prefix="lcd") if lcd_workers > 1 else None
+
         try:
             while not self._stop.is_set():
                 frame = _read_frame(cap, picam2)
@@ -354,18 +368,18 @@ class PanelMonitor:
                 leds_cfg = cfg.get("led_rois", {}) or {}
 
                 # --- read LCDs (digits only, color-aware) ---
-                lcd_digits: list[str] = []
+                lcd_digits: list[str]
                 hints = (cfg.get("lcd_color_hint") or {})
                 seg_thr = float(cfg.get("seg_threshold", 0.35))
                 digits = int(cfg.get("digit_count_per_lcd", 4))
 
-                for key in ("lcd1","lcd2","lcd3","lcd4"):
-                    roi = lcds_cfg.get(key)
-                    if not roi:
-                        lcd_digits.append(""); continue
-                    tile = _crop(frame, roi)
-                    val, _ = read_lcd_roi(tile, digits, hints.get(key))
-                    lcd_digits.append(val)
+                lcd_jobs = [(_crop(frame, lcds_cfg[key]), digits, hints.get(key)) if lcds_cfg.get(key) else None
+                            for key in ("lcd1","lcd2","lcd3","lcd4")]
+                if lcd_pool is not None:
+                    futs = [lcd_pool.submit(read_lcd_roi, *job) if job else None for job in lcd_jobs]
+                    lcd_digits = [f.result()[0] if f else "" for f in futs]
+                else:
+                    lcd_digits = [read_lcd_roi(*job)[0] if job else "" for job in lcd_jobs]
 
 
                 # --- sign ROIs (minus indicators) ---
@@ -416,11 +430,13 @@ class PanelMonitor:
                     self._latest = payload
 
                 # ----- MQTT: per-change events + retained status -----
+                if self._pub is None and self._mqtt_wanted:
+                    self._attach_publisher()
                 # LEDs
                 for name, _old, newv in self._leds_diff(self._last_pub_leds, led_states):
                     try:
                         if self._pub:
-                            self._pub.publish_json(
+                            self._pub.publish_json_async(
                                 self._topic_led_evt,
                                 {"ts": int(now), "name": name, "value": "on" if newv else "off"},
                                 qos=0, retain=False
@@ -432,7 +448,7 @@ class PanelMonitor:
                 for lcd_id, _old, newv in self._lcds_diff(self._last_pub_lcds, lcd_vals):
                     try:
                         if self._pub:
-                            self._pub.publish_json(
+                            self._pub.publish_json_async(
                                 self._topic_lcd_evt,
                                 {"ts": int(now), "id": lcd_id, "value": newv or ""},
                                 qos=0, retain=False
@@ -460,6 +476,8 @@ class PanelMonitor:
                 time.sleep(self.period)
 
         finally:
+            if lcd_pool is not None:
+                lcd_pool.shutdown(wait=False, cancel_futures=True)
             if picam2:
                 try:
                     picam2.stop()
@@ -470,8 +488,3 @@ class PanelMonitor:
                     cap.release()
                 except Exception:
                     pass
-            if self._pub:
-                try:
-                    self._pub.close()
-                except Exception:
-                    pass
\ No newline at end of file
@@ -29,6 +29,8 @@ class PanelSnapshot:
 
         self.dst = Path(app.instance_path) / "snapshot.jpg"
         self.dst.parent.mkdir(parents=True, exist_ok=True)
+        # a capture interrupted by a crash leaves its temp frame behind
+        self.dst.with_suffix(".tmp.jpg").unlink(missing_ok=True)
         if not self.dst.exists():
             self._write_placeholder(self.dst)
 
@@ -63,6 +65,8 @@ class PanelSnapshot:
         self.started = True
 
     def stop(self):
+        if self._stop.is_set():
+            return
         self._stop.set()
         try:
             self._t.join(timeout=2.0)
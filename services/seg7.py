@@ -7,6 +7,7 @@
 
 from __future__ import annotations
 from typing import List, Tuple, Optional, Dict
+import threading
 import numpy as np
 import cv2
 
@@ -44,6 +45,10 @@ EDGE_TRIM_FRAC: float = 0.02  # >>> a bit less trimming than 0.04
 HSV_RED1 = ((0, 80, 60), (10, 255, 255))
 HSV_RED2 = ((170, 80, 60), (180, 255, 255))
 
+# Built once rather than per ROI: gate bounds, 2x2 morphology kernel
+_RED_BOUNDS = tuple(np.array(b, dtype=np.uint8) for b in (*HSV_RED1, *HSV_RED2))
+_K2 = np.ones((2, 2), np.uint8)
+
 # "Weak-8" suppression: how many segments ON before we believe a digit
 WEAK8_MIN_ON: int = 3
 
@@ -103,16 +108,13 @@ def _percentile_thresh(g: np.ndarray, p: float, invert: bool = False) -> np.ndar
 # --------------------------------
 def _red_mask(bgr: np.ndarray) -> np.ndarray:
     hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
-    lower1 = np.array(HSV_RED1[0], dtype=np.uint8)
-    upper1 = np.array(HSV_RED1[1], dtype=np.uint8)
-    lower2 = np.array(HSV_RED2[0], dtype=np.uint8)
-    upper2 = np.array(HSV_RED2[1], dtype=np.uint8)
+    lower1, upper1, lower2, upper2 = _RED_BOUNDS
     m1 = cv2.inRange(hsv, lower1, upper1)
     m2 = cv2.inRange(hsv, lower2, upper2)
     mask = cv2.bitwise_or(m1, m2)
     # light open to reduce salt; then dilate a touch to bridge splits
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8), iterations=1)
-    mask = cv2.dilate(mask, np.ones((2, 2), np.uint8), iterations=1)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, _K2, iterations=1)
+    mask = cv2.dilate(mask, _K2, iterations=1)
     return mask  # 0/255
 
 def _apply_gate(gray: np.ndarray, mask255: np.ndarray) -> np.ndarray:
@@ -123,18 +125,20 @@ def _apply_gate(gray: np.ndarray, mask255: np.ndarray) -> np.ndarray:
 # --------------------------------
 # NEW: robust ROI → binary preprocessor (used by both methods)
 # --------------------------------
-def _preprocess_roi_to_bw(
-    roi_bgr: np.ndarray,
-    use_red: bool,
-    invert: bool = False,
-) -> np.ndarray:
+_tls = threading.local()
+
+def _clahe():
+    # CLAHE objects keep scratch buffers, so one per thread (monitor, LCD pool, requests)
+    c = getattr(_tls, "clahe", None)
+    if c is None:
+        c = _tls.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return c
+
+def _equalize_roi(roi_bgr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    ROI -> upscale ×3 -> CLAHE (LAB L-channel) -> (optional) red gate ->
-    Otsu (fallback: adaptive) -> morphology close→open -> return white-on-black (unless invert=True)
+    ROI -> upscale ×3 -> CLAHE (LAB L-channel); returns (equalized BGR, its gray).
+    Shared by every binarization of the same ROI so the colour work runs once.
     """
-    if roi_bgr is None or roi_bgr.size == 0:
-        return np.zeros((0, 0), np.uint8)
-
     # always upscale small ROIs to make segments chunkier/stable
     h = roi_bgr.shape[0]
     if h < 3 * UPSCALE_MIN_H:
@@ -143,11 +147,17 @@ def _preprocess_roi_to_bw(
     # CLAHE on L
     lab = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2LAB)
     L, A, B = cv2.split(lab)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    L = clahe.apply(L)
+    L = _clahe().apply(L)
     roi_eq = cv2.cvtColor(cv2.merge((L, A, B)), cv2.COLOR_LAB2BGR)
+    return roi_eq, _to_gray(roi_eq)
 
-    gray = _to_gray(roi_eq)
+def _equalized_to_bw(
+    roi_eq: np.ndarray,
+    gray: np.ndarray,
+    use_red: bool,
+    invert: bool = False,
+) -> np.ndarray:
+    """(optional) red gate -> Otsu (fallback: adaptive) -> morphology on an _equalize_roi result."""
     if use_red:
         mask = _red_mask(roi_eq)
         gray = _apply_gate(gray, mask)
@@ -164,11 +174,24 @@ def _preprocess_roi_to_bw(
 
     # stabilize segments: close then gentle open
     if min(bw.shape[:2]) >= 8:
-        k = np.ones((2, 2), np.uint8)
-        bw = cv2.morphologyEx(bw, cv2.MORPH_OPEN,  k, iterations=1)
+        bw = cv2.morphologyEx(bw, cv2.MORPH_OPEN,  _K2, iterations=1)
 
     return bw
 
+def _preprocess_roi_to_bw(
+    roi_bgr: np.ndarray,
+    use_red: bool,
+    invert: bool = False,
+) -> np.ndarray:
+    """
+    ROI -> upscale ×3 -> CLAHE (LAB L-channel) -> (optional) red gate ->
+    Otsu (fallback: adaptive) -> morphology close→open -> return white-on-black (unless invert=True)
+    """
+    if roi_bgr is None or roi_bgr.size == 0:
+        return np.zeros((0, 0), np.uint8)
+    roi_eq, gray = _equalize_roi(roi_bgr)
+    return _equalized_to_bw(roi_eq, gray, use_red, invert)
+
 # --------------------------------
 # Tile split and blank checks
 # --------------------------------
@@ -363,9 +386,10 @@ def ssocr_read_digits(
     if roi_bgr is None or roi_bgr.size == 0:
         return "", meta
 
-    # Build binary variants consistently with Method 1
-    strong_bw = _preprocess_roi_to_bw(roi_bgr, use_red=True,  invert=False)
-    soft_bw   = _preprocess_roi_to_bw(roi_bgr, use_red=False, invert=False)
+    # Build binary variants consistently with Method 1 (one upscale/CLAHE/gray for both)
+    roi_eq, gray = _equalize_roi(roi_bgr)
+    strong_bw = _equalized_to_bw(roi_eq, gray, use_red=True,  invert=False)
+    soft_bw   = _equalized_to_bw(roi_eq, gray, use_red=False, invert=False)
 
     variants = [
         ("soft",   False, soft_bw),
@@ -1,6 +1,6 @@
 # services/solenoid_monitor.py
 from __future__ import annotations
-import logging, time, signal, atexit
+import logging, time, signal, atexit, threading
 from typing import Optional
 from gpiozero import Button
 from db import log_alert_history, load_settings_dict
@@ -58,12 +58,17 @@ class SolenoidMonitor:
 
         # MQTT (provided by app)
         self._pub = None
+        self._pub_enabled = False
+        self._pub_lock = threading.Lock()
+        self._announced = False    # "started" + initial state published
         self._base = None
         self._topic_state = None   # base/solenoid/state   (non-retained)
         self._topic_status = None  # base/solenoid/status  (retained)
 
         # graceful stop hook (only registered when start() succeeds)
         self._sig_reg = False
+        # stop() is reachable from signals, atexit and the app cleanup hook
+        self._stopped = threading.Event()
 
     # ---------- public API ----------
     def external_alert(self, sensor: str, sensor_description: str, sensor_val: str, alert_text: str, force: bool = False):
@@ -76,19 +81,13 @@ class SolenoidMonitor:
 
         if not self.app:
             raise RuntimeError("SolenoidMonitor requires Flask app")
+        self._stopped.clear()
 
-        # MQTT must already be initialized by the app:
+        # MQTT is initialized by the app, possibly after we start:
         # - app.extensions['mqtt_publisher'] is a connected publisher
         # - app.config['MQTT_TOPIC_BASE'] is the base topic
-        try:
-            self._pub = get_publisher(self.app)
-            self._pub_enabled = True
-            self._base = (self.app.config.get("MQTT_TOPIC_BASE") or "").rstrip("/")
-            self._topic_state  = f"{self._base}/solenoid/state"
-            self._topic_status = f"{self._base}/solenoid/status"
-        except Exception as e:
-            self._pub_enabled = False
-            logging.info(f"MQTT not connected: {e}")
+        # If it is not up yet, the app calls attach_publisher() once it is.
+        self.attach_publisher()
 
         # Init GPIO
         try:
@@ -109,9 +108,8 @@ class SolenoidMonitor:
         self._log.info("Fuel solenoid initial state: %s", self._last_state)
 
         # Publish lifecycle + initial state
-        if self._pub_enabled:
-            self._publish_status("started")
-            self._publish_state_change(self._last_state, initial=True)
+        with self._pub_lock:
+            self._announce()
         
         try:
             self.app.sse_hub.publish("health", self.health())
@@ -143,6 +141,10 @@ class SolenoidMonitor:
             )
 
     def stop(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+
         # lifecycle event first (best effort)
         try:
             if self._pub_enabled:
@@ -178,7 +180,32 @@ class SolenoidMonitor:
             ),
         }
 
+    def attach_publisher(self) -> bool:
+        """Pick up the app's MQTT publisher; announce state if already running."""
+        with self._pub_lock:
+            if self._pub is not None:
+                return True
+            try:
+                self._pub = get_publisher(self.app)
+            except Exception as e:
+                logging.info("MQTT not connected: %s", e)
+                return False
+            self._pub_enabled = True
+            self._base = (self.app.config.get("MQTT_TOPIC_BASE") or "").rstrip("/")
+            self._topic_state  = f"{self._base}/solenoid/state"
+            self._topic_status = f"{self._base}/solenoid/status"
+            if self._last_state is not None:
+                self._announce()
+            return True
+
     # ---------- internals ----------
+    def _announce(self):
+        # caller holds _pub_lock
+        if self._pub_enabled and not self._announced:
+            self._publish_status("started")
+            self._publish_state_change(self._last_state, initial=True)
+            self._announced = True
+
     def _on_sig_exit(self, *_):
         try:
             self.stop()
@@ -282,7 +309,7 @@ class SolenoidMonitor:
             self._log.warning("Alert history write failed.", exc_info=True)
 
     def _handle_state_change(self, cfg: dict, sensor: str, sensor_description: str, state: str):
-        self._log.info(f"{sensor} ({sensor_description}) is now {state}")
+        self._log.info("%s (%s) is now %s", sensor, sensor_description, state)
 
         if state == "ON":
             if cfg.get("enable_speaker_alert"):
@@ -332,7 +359,7 @@ class SolenoidMonitor:
                 self._log.info("[SPEAKER] queued")
                 self._log_alert_history("Notification", sensor, sensor_val, "speaker", "success")
             except Exception as e:
-                self._log.info(f"[SPEAKER] FAILED: {e}")
+                self._log.info("[SPEAKER] FAILED: %s", e)
                 self._log_alert_history("Notification", sensor, sensor_val, "speaker", "error", str(e))
         else:
             self._log.info("[SPEAKER] disabled. Skipping")
@@ -348,7 +375,7 @@ class SolenoidMonitor:
                 self._log.info("[PHONE] processed with provider %s: %s", prov_log, call_res)
                 self._log_alert_history("Notification", sensor, sensor_val, "phone", "success")
             except Exception as e:
-                self._log.info(f"[PHONE] FAILED: {e}")
+                self._log.info("[PHONE] FAILED: %s", e)
                 self._log_alert_history("Notification", sensor, sensor_val, "phone", "error", str(e))
         else:
             self._log.info("[PHONE] disabled. Skipping")
@@ -361,7 +388,7 @@ class SolenoidMonitor:
                 self._log.info("[EMAIL] processed: %s", email_res)
                 self._log_alert_history("Notification", sensor, sensor_val, "email", "success")
             except Exception as e:
-                self._log.info(f"[EMAIL] FAILED: {e}")
+                self._log.info("[EMAIL] FAILED: %s", e)
                 self._log_alert_history("Notification", sensor, sensor_val, "email", "error", str(e))
         else:
             self._log.info("[EMAIL] disabled. Skipping")
@@ -374,7 +401,7 @@ class SolenoidMonitor:
                 self._log.info("[SMS] processed: %s", sms_res)
                 self._log_alert_history("Notification", sensor, sensor_val, "sms", "success")
             except Exception as e:
-                self._log.info(f"[SMS] FAILED: {e}")
+                self._log.info("[SMS] FAILED: %s", e)
                 self._log_alert_history("Notification", sensor, sensor_val, "sms", "error", str(e))
         else:
             self._log.info("[SMS] disabled. Skipping")
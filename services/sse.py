@@ -1,8 +1,8 @@
 # services/sse.py
 from __future__ import annotations
-import json, time
+import json, threading, time
 from queue import Queue, Empty
-from typing import Dict, Any, Iterator, List, Tuple, Iterable, Union
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Iterable, Union
 
 InitialItem = Tuple[str, Dict[str, Any]]  # (event_name, payload)
 InitialArg = Union[
@@ -13,22 +13,34 @@ InitialArg = Union[
 ]
 
 class SseHub:
-    """Fan-out hub for SSE. Each client gets a Queue of messages."""
-    def __init__(self, keepalive_s: float = 25.0, max_q: int = 32):
+    """
+    Fan-out hub for SSE. Each client gets a Queue of messages.
+    Every open stream pins a server worker thread for its lifetime, so
+    register() refuses new clients past max_clients (the server reserves
+    that many threads for streams on top of its request threads).
+    """
+    def __init__(self, keepalive_s: float = 25.0, max_q: int = 32, max_clients: int = 0):
         self.keepalive_s = keepalive_s
         self.max_q = max_q
+        self.max_clients = max_clients  # 0 = unlimited
         self._clients: List[Queue] = []
+        self._lock = threading.Lock()
 
-    def register(self) -> Queue:
-        q = Queue(maxsize=self.max_q)
-        self._clients.append(q)
-        return q
+    def register(self) -> Optional[Queue]:
+        """New client queue, or None if max_clients streams are already open."""
+        with self._lock:
+            if self.max_clients and len(self._clients) >= self.max_clients:
+                return None
+            q = Queue(maxsize=self.max_q)
+            self._clients.append(q)
+            return q
 
     def unregister(self, q: Queue):
-        try:
-            self._clients.remove(q)
-        except ValueError:
-            pass
+        with self._lock:
+            try:
+                self._clients.remove(q)
+            except ValueError:
+                pass
 
     def publish(self, event: str, data: Dict[str, Any]):
         """Broadcast a typed SSE event to all clients."""
@@ -62,8 +74,12 @@ class SseHub:
             # swallow bad initial input to avoid breaking the stream
             return
 
-    def stream(self, initial: InitialArg = None) -> Iterator[str]:
-        q = self.register()
+    def stream(self, initial: InitialArg = None, q: Optional[Queue] = None) -> Iterator[str]:
+        """Yield SSE frames for q (registered by the caller, or here if None)."""
+        if q is None:
+            q = self.register()
+            if q is None:
+                return
         try:
             # Optional one-time seed events
             yield from self._write_initial(initial)
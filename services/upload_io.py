@@ -0,0 +1,21 @@
+# services/upload_io.py
+from __future__ import annotations
+import os
+import shutil
+from pathlib import Path
+
+_CHUNK = 1024 * 1024
+
+def save_file_storage(file_storage, dest: Path | str, chunk: int = _CHUNK) -> None:
+    """
+    Write an uploaded werkzeug FileStorage to `dest` in 1 MiB chunks
+    (FileStorage.save() copies 16 KiB at a time), then tell the kernel the
+    pages won't be re-read so a big upload doesn't evict the page cache.
+    """
+    with open(dest, "wb", buffering=0) as dst:
+        shutil.copyfileobj(file_storage.stream, dst, length=chunk)
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(dst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
@@ -15,6 +15,28 @@ async function apiPost(url, body) {
   if (!r.ok) throw new Error(await r.text());
   return r.json();
 }
+// Long-running admin actions answer 202 + job_id; poll until the job finishes.
+// Gives up after JOB_TIMEOUT_MS (the server's own step timeouts are 600 s)
+// with { ok: false, timedOut: true } so callers can re-enable their buttons.
+const JOB_TIMEOUT_MS = 600 * 1000;
+const JOB_STILL_RUNNING = "Still running on the device; check Logs below.";
+
+async function runJob(url, body) {
+  const r = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: body ? JSON.stringify(body) : null,
+  });
+  const j = await r.json();
+  if (r.status !== 202 || !j.job_id) return { ok: r.ok, j };
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    await new Promise((res) => setTimeout(res, 1500));
+    const s = await apiGet(`/api/admin/jobs/${encodeURIComponent(j.job_id)}`);
+    if (s.done) return { ok: s.http_status < 400, j: s.result || {} };
+  }
+  return { ok: false, timedOut: true, j: { error: JOB_STILL_RUNNING } };
+}
 
 // ---------- Toast (brief, success-only) ----------
 function toast(message) {
@@ -174,7 +196,13 @@ async function doUpdate() {
   progressShow("Update in progress…", "Creating backup and syncing files from GitHub.");
 
   try {
-    const j = await apiPost("/api/admin/update");
+    const { ok, j, timedOut } = await runJob("/api/admin/update");
+    if (timedOut) {
+      progressUpdate("Update still running", JOB_STILL_RUNNING);
+      setAllControlsDisabled(false);
+      return;
+    }
+    if (!ok) throw new Error(j.error || "Update failed");
     if (j.status === "ok") {
       progressUpdate("Update successful. Restarting…", "Do not close this page.");
       try { await apiPost("/api/admin/reboot"); } catch {}
@@ -199,7 +227,14 @@ async function doRollback() {
     if (u) u.disabled = true;
     if (r) r.disabled = true;
     $("#updateStatus").textContent = "Rolling back…";
-    const j = await apiPost("/api/admin/rollback");
+    const { ok, j, timedOut } = await runJob("/api/admin/rollback");
+    if (timedOut) {
+      $("#updateStatus").textContent = JOB_STILL_RUNNING;
+      if (u) u.disabled = false;
+      if (r) r.disabled = false;
+      return;
+    }
+    if (!ok) throw new Error(j.error || "Rollback failed");
     $("#updateStatus").textContent = j.status || "Rollback complete.";
     await loadVersions();
   } catch {
@@ -277,14 +312,8 @@ async function createBundle() {
   progressShow("Building bundle…", "Collecting logs, ROIs and metadata.");
 
   try {
-    const r = await fetch("/api/admin/support/bundle", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ include_snapshot: include })
-    });
-    const j = await r.json();
-
-    if (!r.ok) throw new Error(j.error || "Bundle failed");
+    const { ok, j } = await runJob("/api/admin/support/bundle", { include_snapshot: include });
+    if (!ok) throw new Error(j.error || "Bundle failed");
 
     // enable download button
     const a = document.getElementById("btnDownloadBundle");
@@ -307,17 +336,12 @@ async function uploadBundle() {
   progressShow("Uploading bundle…", "Sending to remote server.");
 
   try {
-    const r = await fetch("/api/admin/support/upload", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({
-        type: "bundle",
-        use_latest: true,
-        include_snapshot: include
-      })
+    const { ok, j } = await runJob("/api/admin/support/upload", {
+      type: "bundle",
+      use_latest: true,
+      include_snapshot: include
     });
-    const j = await r.json();
-    if (!r.ok) throw new Error(j.error || "Upload failed");
+    if (!ok) throw new Error(j.error || "Upload failed");
 
     progressHide();
     toast("Bundle uploaded");
@@ -334,13 +358,8 @@ async function uploadSnapshotOnly() {
   progressShow("Uploading snapshot…", "Sending latest camera snapshot.");
 
   try {
-    const r = await fetch("/api/admin/support/upload", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ type: "snapshot" })
-    });
-    const j = await r.json();
-    if (!r.ok) throw new Error(j.error || "Upload failed");
+    const { ok, j } = await runJob("/api/admin/support/upload", { type: "snapshot" });
+    if (!ok) throw new Error(j.error || "Upload failed");
 
     progressHide();
     toast("Snapshot uploaded");
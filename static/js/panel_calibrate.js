@@ -296,9 +296,12 @@ document.addEventListener('DOMContentLoaded', async () => {
     if (!uploadedFileBlob) return;
     tryShowProgress('Decoding uploaded snapshot…');
     try {
-      const fd = new FormData();
-      fd.append('image', uploadedFileBlob, uploadedFileBlob.name || 'upload.jpg');
-      const res = await fetch('/api/panel/dry_run', { method: 'POST', body: fd });
+      // raw image body: no multipart framing for the server to scan
+      const res = await fetch('/api/panel/dry_run?preview=0', {
+        method: 'POST',
+        headers: { 'Content-Type': uploadedFileBlob.type || 'image/jpeg' },
+        body: uploadedFileBlob,
+      });
       const j = await res.json().catch(() => ({}));
       if (!res.ok || j.error) throw new Error(j.error || 'Dry-run failed');
       console.log(j);